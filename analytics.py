@@ -0,0 +1,287 @@
+"""
+This script computes statistics over all entries, e.g. for trend reports.
+
+The entries are loaded once into column arrays (date ordinals, integer cents and category codes)
+and every statistic is computed with vectorised numpy operations on those columns.
+It doesn't use kivy, so it can be used headless:
+
+    python analytics.py --db ./assets/data.db
+"""
+
+import datetime
+
+import numpy as np
+
+from data_management import DataManagement, format_cents
+
+# date.toordinal() of 1970-01-01, the epoch of numpy datetime64
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+class LedgerArrays:
+    """Entries as columns: one element per entry, ordered by date."""
+
+    def __init__(self, dates: np.ndarray, cents: np.ndarray, codes: np.ndarray, categories: list):
+        """
+        :param dates: int64 array of date ordinals, see datetime.date.toordinal
+        :param cents: int64 array of values in cents
+        :param codes: int32 array of category codes, index into categories
+        :param categories: list of category names
+        """
+
+        self.dates = dates
+        self.cents = cents
+        self.codes = codes
+        self.categories = categories
+
+    @classmethod
+    def load(cls, data_management: DataManagement = None):
+        """
+        Load all entries with one query.
+
+        :param data_management: DataManagement of the db file, default DataManagement.instance()
+        :return: LedgerArrays
+        """
+
+        dm = data_management or DataManagement.instance()
+
+        cur = dm.cursor()
+        cur.execute(
+            # julianday - 1721424.5 is the proleptic gregorian ordinal of python's date.toordinal
+            "SELECT CAST(julianday(date) - 1721424.5 AS INTEGER), value, category_id "
+            + "FROM " + dm.entry_table_name + " "
+            + "ORDER BY date, id"
+        )
+        rows = np.array(cur.fetchall(), dtype=np.int64).reshape(-1, 3)
+
+        # category ids -> compact codes 0..n-1
+        category_ids, codes = np.unique(rows[:, 2], return_inverse=True)
+        names_by_id = {category_id: name for name, category_id in dm.get_category_ids().items()}
+        categories = [names_by_id.get(int(category_id), str(category_id)) for category_id in category_ids]
+
+        return cls(rows[:, 0].copy(), rows[:, 1].copy(), codes.astype(np.int32), categories)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def select(self, mask: np.ndarray):
+        """
+        Subset of the entries, e.g. ledger.select(ledger.cents < 0) for the expenses.
+
+        :param mask: bool array with one element per entry
+        :return: LedgerArrays
+        """
+
+        return LedgerArrays(self.dates[mask], self.cents[mask], self.codes[mask], self.categories)
+
+    def between(self, start: datetime.date, end: datetime.date):
+        """
+        Entries of a date range; the dates are sorted, so this is a binary search, not a mask.
+
+        :param start: first date of the range
+        :param end: date after the range (exclusive)
+        :return: LedgerArrays
+        """
+
+        lo, hi = np.searchsorted(self.dates, [start.toordinal(), end.toordinal()])
+        return LedgerArrays(self.dates[lo:hi], self.cents[lo:hi], self.codes[lo:hi], self.categories)
+
+    def months(self) -> np.ndarray:
+        """
+        Month of every entry as number of months since 1970-01.
+
+        :return: int64 array
+        """
+
+        return (self.dates - EPOCH_ORDINAL).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+
+def month_label(month: int) -> str:
+    """ Months since 1970-01 -> 'yyyy-mm' """
+    return f"{1970 + month // 12:04d}-{month % 12 + 1:02d}"
+
+
+# region totals
+def daily_totals(ledger: LedgerArrays) -> tuple:
+    """
+    Sum of the values per day, from the first to the last entry, days without entries are 0.
+
+    :return: tuple (int64 array of date ordinals, int64 array of cents)
+    """
+
+    if not len(ledger):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    first = ledger.dates[0]
+    totals = np.bincount(ledger.dates - first, weights=ledger.cents).astype(np.int64)
+    return np.arange(first, first + len(totals), dtype=np.int64), totals
+
+
+def monthly_totals(ledger: LedgerArrays) -> tuple:
+    """
+    Sum of the values per month, from the first to the last entry, months without entries are 0.
+
+    :return: tuple (int64 array of months since 1970-01, int64 array of cents)
+    """
+
+    if not len(ledger):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    months = ledger.months()
+    first = months[0]
+    totals = np.bincount(months - first, weights=ledger.cents).astype(np.int64)
+    return np.arange(first, first + len(totals), dtype=np.int64), totals
+
+
+def category_totals(ledger: LedgerArrays) -> dict:
+    """
+    Number of entries, sum and mean of the values per category.
+
+    :return: dict {'category': {'count': int, 'total': int cents, 'mean': float cents}}
+    """
+
+    nr_categories = len(ledger.categories)
+    counts = np.bincount(ledger.codes, minlength=nr_categories)
+    totals = np.bincount(ledger.codes, weights=ledger.cents, minlength=nr_categories).astype(np.int64)
+    means = totals / np.maximum(counts, 1)
+
+    return {
+        ledger.categories[code]: {'count': int(counts[code]), 'total': int(totals[code]), 'mean': float(means[code])}
+        for code in np.flatnonzero(counts)
+    }
+# endregion
+
+
+# region trends
+def rolling_stats(ledger: LedgerArrays, window: int = 30) -> dict:
+    """
+    Trailing rolling sum, mean and standard deviation of the daily totals.
+    The first window - 1 days use the days available so far.
+
+    :param window: number of days
+    :return: dict of arrays with one element per day: 'dates' (ordinals), 'sum', 'mean', 'std' (cents)
+    """
+
+    dates, totals = daily_totals(ledger)
+
+    # rolling sums as difference of cumulative sums
+    values = totals.astype(np.float64)
+    cumsum = np.concatenate(([0.0], np.cumsum(values)))
+    cumsum_sq = np.concatenate(([0.0], np.cumsum(values * values)))
+    upper = np.arange(1, len(values) + 1)
+    lower = np.maximum(upper - window, 0)
+    n = upper - lower
+
+    rolling_sum = cumsum[upper] - cumsum[lower]
+    rolling_mean = rolling_sum / n
+    variance = (cumsum_sq[upper] - cumsum_sq[lower]) / n - rolling_mean * rolling_mean
+
+    return {
+        'dates': dates,
+        'sum': rolling_sum,
+        'mean': rolling_mean,
+        'std': np.sqrt(np.maximum(variance, 0.0)),  # clip rounding errors below 0
+    }
+
+
+def month_over_month(ledger: LedgerArrays) -> dict:
+    """
+    Monthly totals and their change to the previous month.
+
+    :return: dict of arrays with one element per month: 'months' (since 1970-01), 'total', 'delta' (cents)
+    """
+
+    months, totals = monthly_totals(ledger)
+    return {
+        'months': months,
+        'total': totals,
+        'delta': np.diff(totals, prepend=totals[:1]),  # 0 for the first month
+    }
+
+
+def year_over_year(ledger: LedgerArrays) -> dict:
+    """
+    Monthly totals compared to the same month of the previous year.
+
+    :return: dict of arrays with one element per month: 'months' (since 1970-01), 'total', 'previous',
+        'delta' (cents) and 'change' (fraction of the previous year's total, nan without previous year or 0)
+    """
+
+    months, totals = monthly_totals(ledger)
+
+    # totals are continuous per month, the previous year is 12 elements back
+    previous = np.zeros_like(totals)
+    previous[12:] = totals[:-12]
+    has_previous = np.arange(len(totals)) >= 12
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = np.where(has_previous & (previous != 0), (totals - previous) / np.abs(previous), np.nan)
+
+    return {
+        'months': months,
+        'total': totals,
+        'previous': previous,
+        'delta': np.where(has_previous, totals - previous, 0),
+        'change': change,
+    }
+# endregion
+
+
+# region distributions
+def category_percentiles(ledger: LedgerArrays, percentiles=(10, 25, 50, 75, 90)) -> dict:
+    """
+    Percentiles of the entry values per category, with linear interpolation like numpy.percentile.
+    All categories are computed at once: the values are sorted per category,
+    then the percentile positions of every category are looked up in one step.
+
+    :param percentiles: percentiles between 0 and 100
+    :return: dict {'category': float array of cents, one element per percentile}
+    """
+
+    if not len(ledger):
+        return {}
+
+    # sort by category, then by value
+    order = np.lexsort((ledger.cents, ledger.codes))
+    values = ledger.cents[order].astype(np.float64)
+
+    counts = np.bincount(ledger.codes, minlength=len(ledger.categories))
+    codes = np.flatnonzero(counts)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[codes]
+    counts = counts[codes]
+
+    # fractional position of every percentile in every category: (categories, percentiles)
+    positions = (counts[:, None] - 1) * (np.asarray(percentiles, dtype=np.float64)[None, :] / 100.0)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, counts[:, None] - 1)
+    fraction = positions - lower
+
+    result = values[starts[:, None] + lower] * (1.0 - fraction) + values[starts[:, None] + upper] * fraction
+
+    return {ledger.categories[code]: result[i] for i, code in enumerate(codes)}
+# endregion
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Print trend statistics of the entries.")
+    parser.add_argument("--db", default=DataManagement.path_db, help="path to the database file")
+    args = parser.parse_args()
+
+    DataManagement.path_db = args.db
+
+    time_start = time.perf_counter()
+    ledger = LedgerArrays.load()
+    print(f"Loaded {len(ledger)} entries in {time.perf_counter() - time_start:.3f}s")
+
+    yoy = year_over_year(ledger)
+    print("\nMonth     total         previous year  change")
+    for month, total, previous, change in zip(yoy['months'], yoy['total'], yoy['previous'], yoy['change']):
+        change_text = f"{change:+.1%}" if not np.isnan(change) else ""
+        print(f"{month_label(int(month))}  {format_cents(int(total)):>12}  {format_cents(int(previous)):>12}  {change_text}")
+
+    print("\nCategory             p10         p50         p90")
+    for category, values in category_percentiles(ledger, (10, 50, 90)).items():
+        print(f"{category[:16]:<16}" + "".join(f"{format_cents(round(v)):>12}" for v in values))
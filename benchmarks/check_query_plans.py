@@ -0,0 +1,133 @@
+"""
+This script guards the query plans of the hot-path database calls against index regressions.
+
+Every hot-path DataManagement method is called on a populated temporary db file, the
+statements it issues are collected with the sqlite trace callback and each of them is
+run through EXPLAIN QUERY PLAN. A plan which scans a whole table or builds a temporary
+b-tree for sorting or grouping fails the check, unless it is explicitly allowed below.
+
+    python -m benchmarks.check_query_plans
+
+Exits with 1 if a plan fails, so it can run before every commit or in a CI job.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+from benchmarks.ledger_generator import generate_ledger
+from data_management import DataManagement
+from db_connection import ConnectionManager
+
+# statements which don't have a query plan
+IGNORED_STATEMENT_PREFIXES = ("BEGIN", "COMMIT", "ROLLBACK", "PRAGMA")
+
+
+def get_hot_paths(dm: DataManagement) -> list:
+    """
+    Hot-path calls of the screens and the plan details they are allowed to have.
+    Loading a whole small table, e.g. all category names for the dropdown, is a scan by design.
+
+    :return: list of (name, call without arguments, set of allowed plan details)
+    """
+
+    months = dm.get_available_dates()
+    month = months[len(months) // 2]
+    categories = dm.get_categories()
+    category = categories[len(categories) // 2]
+    first_page, next_page = dm.get_entries_page(month, limit=10)
+
+    return [
+        # one row per month and category; months are read in primary key order
+        ("get_available_dates", dm.get_available_dates, {"SCAN month_summary"}),
+        ("get_entries_by_date", lambda: dm.get_entries_by_date(month), set()),
+        ("get_entries_page", lambda: dm.get_entries_page(month), set()),
+        ("get_entries_page next", lambda: dm.get_entries_page(month, after=next_page, limit=10), set()),
+        ("get_month_total", lambda: dm.get_month_total(month), set()),
+        # the category cache loads all categories at once
+        ("get_categories", dm.get_categories, {"SCAN category"}),
+        ("get_category_id", lambda: dm.get_category_id(category), {"SCAN category"}),
+        ("count_entries_by_category", lambda: dm.count_entries_by_category(categories[:5]), set()),
+        ("count_entries_by_month", lambda: dm.count_entries_by_month(months[:5]), set()),
+    ]
+
+
+def collect_statements(path_db: str, call) -> list:
+    """
+    Run call and collect the sql statements it issues on the connection of this thread.
+
+    :return: list of sql statements with the bound values
+    """
+
+    statements = []
+    con = ConnectionManager.get_connection(path_db)
+    con.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        con.set_trace_callback(None)
+
+    return [s for s in statements if not s.lstrip().upper().startswith(IGNORED_STATEMENT_PREFIXES)]
+
+
+def find_plan_violations(cur, statement: str, allowed: set) -> list:
+    """
+    :return: list of the plan details which scan a table or use a temp b-tree and are not allowed
+    """
+
+    violations = []
+    for _, _, _, detail in cur.execute("EXPLAIN QUERY PLAN " + statement).fetchall():
+        # full-text search lookups show up as scan of the virtual table
+        is_scan = detail.startswith("SCAN ") and "VIRTUAL TABLE" not in detail
+        is_temp_b_tree = "TEMP B-TREE" in detail
+        if (is_scan or is_temp_b_tree) and not any(detail.startswith(a) for a in allowed):
+            violations.append(detail)
+    return violations
+
+
+def check_query_plans(nr_entries: int = 20000, nr_categories: int = 100) -> int:
+    """
+    Check the query plans of the hot-path calls on a populated temporary db file.
+
+    :return: number of failed statements
+    """
+
+    tmp_dir = tempfile.mkdtemp(prefix="budget_query_plans_")
+    nr_failed = 0
+
+    try:
+        dm = DataManagement(path_db=os.path.join(tmp_dir, "data.db"))
+        dm.import_all(generate_ledger(nr_entries, nr_categories))
+        cur = dm.cursor()
+
+        for name, call, allowed in get_hot_paths(dm):
+            # uncached, so the statements are issued
+            dm.clear_result_cache()
+            dm.invalidate_category_cache()
+
+            statements = collect_statements(dm.path_db, call)
+            if not statements:
+                print(f"FAIL {name}: no statements collected")
+                nr_failed += 1
+                continue
+
+            for statement in statements:
+                violations = find_plan_violations(cur, statement, allowed)
+                if violations:
+                    nr_failed += 1
+                    print(f"FAIL {name}: {'; '.join(violations)}\n     {statement}")
+                else:
+                    print(f"ok   {name}")
+
+    finally:
+        ConnectionManager.close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return nr_failed
+
+
+if __name__ == "__main__":
+    nr_failed = check_query_plans()
+    print(f"\n{nr_failed} statement(s) with a full table scan or temp b-tree" if nr_failed else "\nAll query plans ok")
+    sys.exit(1 if nr_failed else 0)
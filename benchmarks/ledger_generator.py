@@ -0,0 +1,79 @@
+"""
+This script generates synthetic ledgers for the benchmarks.
+
+The same arguments always generate the same ledger, so benchmark results of
+different commits are measured on the same data. The ledger has the format of
+DataManagement.export_all, so it can be imported with DataManagement.import_all
+or written to a file like an exported db.json:
+
+    python -m benchmarks.ledger_generator --entries 100000 --categories 200 --output ./ledger.json
+"""
+
+import datetime
+import json
+import random
+
+ITEM_NAMES = [
+    "Groceries", "Rent", "Salary", "Coffee", "Restaurant", "Train ticket", "Fuel", "Insurance",
+    "Electricity", "Internet", "Phone", "Pharmacy", "Books", "Cinema", "Gym", "Clothes",
+    "Gift", "Taxi", "Hotel", "Flight", "Bakery", "Hardware store", "Subscription", "Donation",
+]
+
+
+def generate_ledger(nr_entries: int, nr_categories: int = 200, years: int = 10,
+                    start_year: int = 2015, seed: int = 0) -> dict:
+    """
+    Generate a ledger with nr_entries entries spread over nr_categories categories and years years.
+    Category sizes follow a long tail: a few categories hold most of the entries, like a real ledger.
+    About every tenth entry is an income, the others are expenses.
+
+    :param nr_entries: number of entries
+    :param nr_categories: number of categories
+    :param years: number of years, starting on January 1st of start_year
+    :param start_year: first year of the ledger
+    :param seed: random seed
+    :return: {'category': [['yyyy-mm-dd', 'name', 'category', '-1.00', id], ...], ...}
+    """
+
+    rng = random.Random(seed)
+
+    categories = [f"Category {i:03d}" for i in range(nr_categories)]
+    category_weights = [1.0 / (i + 1) for i in range(nr_categories)]
+
+    start_ordinal = datetime.date(start_year, 1, 1).toordinal()
+    nr_days = datetime.date(start_year + years, 1, 1).toordinal() - start_ordinal
+
+    ledger = {category: [] for category in categories}
+    entry_categories = rng.choices(categories, weights=category_weights, k=nr_entries)
+    for entry_id, category in enumerate(entry_categories, start=1):
+        date = datetime.date.fromordinal(start_ordinal + rng.randrange(nr_days)).isoformat()
+        name = f"{rng.choice(ITEM_NAMES)} {rng.randrange(1000)}"
+        if rng.random() < 0.1:
+            cents = rng.randrange(1000, 500000)
+        else:
+            cents = -int(rng.lognormvariate(7.0, 1.2))
+        ledger[category].append([date, name, category, f"{cents / 100:.2f}", entry_id])
+
+    return ledger
+
+
+def write_ledger(path: str, ledger: dict):
+    """ Write a ledger as json file, like an exported db.json """
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(ledger, f, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic ledger json file.")
+    parser.add_argument("--entries", type=int, default=100000, help="number of entries")
+    parser.add_argument("--categories", type=int, default=200, help="number of categories")
+    parser.add_argument("--years", type=int, default=10, help="number of years")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", default="./ledger.json", help="path of the json file")
+    args = parser.parse_args()
+
+    write_ledger(args.output, generate_ledger(args.entries, args.categories, args.years, seed=args.seed))
+    print(f"Wrote {args.entries} entries in {args.categories} categories to '{args.output}'")
@@ -0,0 +1,213 @@
+"""
+This script times the DataManagement operations on synthetic ledgers of different sizes.
+
+Every size is imported into a new temporary db file, then every operation is timed.
+The results are written as json, so the results of two commits can be compared:
+
+    python -m benchmarks.run_benchmarks --sizes 1000 10000 100000
+    python -m benchmarks.run_benchmarks --compare ./benchmarks/results/<commit>.json
+
+It doesn't use kivy, so it runs headless.
+"""
+
+import datetime
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.ledger_generator import generate_ledger
+from data_management import DataManagement
+from db_connection import ConnectionManager
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+# number of calls of the repeated single statement operations
+REPEATED_CALLS = 1000
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def time_operation(func, repeat: int, setup=None) -> dict:
+    """
+    Time func repeat times.
+
+    :param func: operation without arguments, returns the result
+    :param repeat: number of runs
+    :param setup: called before every run, not timed
+    :return: dict with 'repeat', 'min', 'median', 'mean', 'max' seconds and 'rows' of the last result
+    """
+
+    times = []
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        time_start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - time_start)
+
+    try:
+        rows = len(result)
+    except TypeError:
+        rows = result
+
+    return {
+        'repeat': repeat,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.fmean(times),
+        'max': max(times),
+        'rows': rows,
+    }
+
+
+def add_elements(dm: DataManagement, categories: list) -> int:
+    """ Add REPEATED_CALLS entries one by one in one transaction, measures the per statement overhead """
+
+    with dm.transaction():
+        for i in range(REPEATED_CALLS):
+            dm.add_element(categories[i % len(categories)], f"Benchmark {i}", "-1.00", "2030-01-01")
+    return REPEATED_CALLS
+
+
+def benchmark_size(nr_entries: int, nr_categories: int, repeat: int, seed: int) -> list:
+    """
+    Import a synthetic ledger into a new db file and time the operations on it.
+
+    :return: list of results, see time_operation, with 'operation' and 'entries'
+    """
+
+    ledger = generate_ledger(nr_entries, nr_categories, seed=seed)
+    tmp_dir = tempfile.mkdtemp(prefix="budget_benchmark_")
+
+    try:
+        dm = DataManagement(path_db=os.path.join(tmp_dir, "data.db"))
+        results = {}
+
+        # write operations on the full ledger
+        results['import_all'] = time_operation(lambda: dm.import_all(ledger)['rows'], 1)
+
+        months = dm.get_available_dates()
+        month = months[len(months) // 2]
+        year = month[:4]
+        categories = dm.get_categories()
+        export_path = os.path.join(tmp_dir, "db.json")
+
+        # read operations, uncached
+        clear_cache = dm.clear_result_cache
+        results['get_available_dates'] = time_operation(dm.get_available_dates, repeat)
+        results['get_entries_by_date'] = time_operation(lambda: dm.get_entries_by_date(month), repeat, clear_cache)
+        results['get_entries_page'] = time_operation(lambda: dm.get_entries_page(month)[0], repeat, clear_cache)
+        results['get_month_total'] = time_operation(lambda: [dm.get_month_total(month)], repeat)
+        results['get_totals_year_by_category'] = time_operation(
+            lambda: dm.get_totals(f"{year}-01-01", f"{int(year) + 1}-01-01", group_by="category"), repeat, clear_cache
+        )
+        results['get_totals_by_week'] = time_operation(
+            lambda: dm.get_totals(f"{year}-01-01", f"{int(year) + 1}-01-01", group_by="week"), repeat, clear_cache
+        )
+        results['count_entries_by_category'] = time_operation(lambda: dm.count_entries_by_category(categories), repeat)
+        results['search_entries'] = time_operation(lambda: dm.search_entries("gro"), repeat)
+        results['get_entries_by_category'] = time_operation(
+            lambda: dm.get_entries_by_category(categories[len(categories) // 2]), repeat
+        )
+        results[f'add_element_x{REPEATED_CALLS}'] = time_operation(lambda: add_elements(dm, categories), repeat)
+        results[f'get_month_total_x{REPEATED_CALLS}'] = time_operation(
+            lambda: [dm.get_month_total(months[i % len(months)]) for i in range(REPEATED_CALLS)], repeat
+        )
+        results['export_all'] = time_operation(lambda: sum(map(len, dm.export_all().values())), repeat)
+        results['export_to_file'] = time_operation(lambda: dm.export_to_file(export_path), repeat)
+
+        # deletions change the data, they run once: a mid-sized category, then the month
+        results['del_category'] = time_operation(lambda: dm.del_categories([categories[len(categories) // 2]])[1], 1)
+        results['del_month'] = time_operation(lambda: dm.del_months([month]), 1)
+
+        return [dict(operation=operation, entries=nr_entries, **result) for operation, result in results.items()]
+
+    finally:
+        ConnectionManager.close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def get_commit() -> str:
+    """ Current git commit, 'unknown' outside of a git checkout """
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def compare_results(previous: dict, current: dict):
+    """ Print the median times of current relative to previous """
+
+    previous_medians = {(r['operation'], r['entries']): r['median'] for r in previous['results']}
+
+    print(f"\n{'operation':<30}{'entries':>10}{'before':>12}{'after':>12}{'ratio':>8}")
+    for result in current['results']:
+        before = previous_medians.get((result['operation'], result['entries']))
+        if before is None:
+            continue
+        ratio = result['median'] / before if before > 0 else float('inf')
+        print(f"{result['operation']:<30}{result['entries']:>10}"
+              f"{before * 1000:>10.2f}ms{result['median'] * 1000:>10.2f}ms{ratio:>8.2f}")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the DataManagement operations.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="numbers of entries")
+    parser.add_argument("--categories", type=int, default=200, help="number of categories")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per read operation")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the ledger generator")
+    parser.add_argument("--cached-statements", type=int, default=ConnectionManager.CACHED_STATEMENTS,
+                        help="prepared statement cache size per connection")
+    parser.add_argument("--output", default=None, help="path of the json results, default results/<commit>.json")
+    parser.add_argument("--compare", default=None, help="json results of a previous run to compare with")
+    args = parser.parse_args(argv)
+
+    ConnectionManager.CACHED_STATEMENTS = args.cached_statements
+
+    commit = get_commit()
+    report = {
+        'meta': {
+            'commit': commit,
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'categories': args.categories,
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'cached_statements': args.cached_statements,
+        },
+        'results': [],
+    }
+
+    for nr_entries in args.sizes:
+        print(f"Benchmark {nr_entries} entries ...", flush=True)
+        for result in benchmark_size(nr_entries, args.categories, args.repeat, args.seed):
+            report['results'].append(result)
+            print(f"  {result['operation']:<30}{result['median'] * 1000:>10.2f}ms  ({result['rows']} rows)")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote results to '{output}'")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare_results(json.load(f), report)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
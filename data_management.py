@@ -1,5 +1,41 @@
+import datetime
+import json
+import os
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from decimal import Decimal, ROUND_HALF_UP
+
 import loghandler
+from db_connection import ConnectionManager
+from query_stats import timed, no_rows
+
+
+def to_cents(value) -> int:
+    """
+    Convert a money value to integer cents, e.g. '-12.50' -> -1250.
+    Empty values are 0 cents.
+
+    :param value: money value as str, int or float
+    :return: int cents
+    """
+
+    if value is None or str(value).strip() == '':
+        return 0
+    return int((Decimal(str(value).strip()) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def format_cents(cents: int) -> str:
+    """
+    Format integer cents as money value, e.g. -1250 -> '-12.50'.
+
+    :param cents: int cents
+    :return: str with two decimals
+    """
+
+    return f"{(cents or 0) / 100:.2f}"
 
 
 class DataManagement:
@@ -8,264 +44,959 @@ class DataManagement:
     path_db = "./assets/data.db"
     category_table_name = "category"
     entry_table_name = "entry"
+    summary_table_name = "month_summary"
+    search_table_name = "entry_fts"
+
+    # version of the table layout, stored in the db file as PRAGMA user_version
+    SCHEMA_VERSION = 5
 
     PATH_LOGFILE = "./logs/data_management.log"
 
-    def __init__(self):
-        # create table
-        con, cur = self.start_connection()
+    # shared instance, see instance()
+    _instance = None
+
+    # db paths which are already bootstrapped in this process
+    _bootstrapped_paths = set()
+    _bootstrap_lock = threading.Lock()
+
+    # category name -> id, per db path; loaded on first use, dropped on category changes
+    _category_cache = {}
+    _category_cache_lock = threading.Lock()
+
+    # db paths with a full-text search table; sqlite builds without FTS5 fall back to LIKE
+    _search_table_available = {}
+
+    # write generation per db path, incremented by every write transaction
+    _write_generation = {}
+
+    # least recently used month and page results: {(path_db, generation, query, args...): result}
+    RESULT_CACHE_SIZE = 32
+    _result_cache = OrderedDict()
+    _result_cache_lock = threading.Lock()
+
+    def __init__(self, path_db: str = None):
+        """
+        :param path_db: path to the database file, default DataManagement.path_db
+        """
+
+        if path_db is not None:
+            self.path_db = path_db
+
+        # create tables and default category, once per process
+        self.bootstrap()
+
+    @classmethod
+    def instance(cls):
+        """
+        Get the shared DataManagement instance.
+        Use this instead of creating a new instance for every call.
+
+        :return: DataManagement
+        """
+
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def bootstrap(self):
+        """
+        Make sure the tables and the default category exist.
+        This runs only once per process and db path, the tables are only created or
+        migrated if the schema version of the db file is older than SCHEMA_VERSION.
+        """
+
+        if self.path_db in self._bootstrapped_paths:
+            return
+
+        with self._bootstrap_lock:
+            if self.path_db in self._bootstrapped_paths:
+                return
+
+            try:
+                with self.transaction() as cur:
+                    schema_version = cur.execute("PRAGMA user_version").fetchone()[0]
+
+                    # create or migrate tables
+                    if schema_version < self.SCHEMA_VERSION:
+                        if self.table_exists(cur, self.entry_table_name):
+                            self.migrate_schema(cur, schema_version)
+                        else:
+                            self.create_table(cur)
+                        cur.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+                    # add default categories
+                    self.add_category("General")
+
+            except Exception as sql_create_err:
+                loghandler.write_log(
+                    self.PATH_LOGFILE,
+                    "SQL CREATE TABLE ERROR: " + str(sql_create_err),
+                    print_log=True,
+                    level=loghandler.ERROR,
+                )
+                return
+
+            self._bootstrapped_paths.add(self.path_db)
+
+    def cursor(self):
+        """ Cursor on the reused connection of the current thread, use for reads. """
+        return ConnectionManager.get_connection(self.path_db).cursor()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Explicit transaction scope, use for writes: `with self.transaction() as cur:`
+        Every write increments the write generation, which invalidates the cached month results.
+        """
+
         try:
-            self.create_table(cur)
-        except Exception as sql_create_err:
-            loghandler.write_log(
-                self.PATH_LOGFILE,
-                "SQL CREATE TABLE ERROR: " + str(sql_create_err),
-                print_log=True,
-            )
-        self.end_connection(con)
+            with ConnectionManager.transaction(self.path_db) as cur:
+                yield cur
+                # before the commit: no other thread hits a result cached before this write once it is visible
+                self._bump_generation()
+        finally:
+            # after the commit: a result read by another thread during the commit is never hit either
+            self._bump_generation()
 
-        # add default categories
-        self.add_category("General")
+    def _bump_generation(self):
+        """ Increment the write generation of the db, see transaction and _get_generation. """
 
-    def start_connection(self):
-        con = sqlite3.connect(self.path_db)
-        cur = con.cursor()
-        return con, cur
+        with self._result_cache_lock:
+            self._write_generation[self.path_db] = self._write_generation.get(self.path_db, 0) + 1
 
     @staticmethod
-    def end_connection(con):
-        con.commit()
-        con.close()
+    def table_exists(cur, table_name: str) -> bool:
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,))
+        return cur.fetchone() is not None
 
     def create_table(self, cur):
+        """ Create the tables with the current schema (SCHEMA_VERSION). """
+
         cur.execute(
             "CREATE TABLE IF NOT EXISTS "
             + self.category_table_name
             + " ("
-            + "category TEXT UNIQUE"
+            + "id INTEGER PRIMARY KEY, "
+            + "category TEXT NOT NULL UNIQUE"
             + ")"
         )
         cur.execute(
             "CREATE TABLE IF NOT EXISTS "
             + self.entry_table_name
             + " ("
-            + "category_id TEXT, "
-            + "name TEXT, "
-            + "value TEXT, "
-            + "date TEXT)"
+            + "id INTEGER PRIMARY KEY, "
+            + "category_id INTEGER NOT NULL "
+            + "REFERENCES " + self.category_table_name + " (id) ON DELETE CASCADE, "
+            + "name TEXT NOT NULL DEFAULT '', "
+            + "value INTEGER NOT NULL DEFAULT 0, "  # cents
+            + "date TEXT NOT NULL)"  # yyyy-mm-dd
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_entry_date "
+            + "ON " + self.entry_table_name + " (date)"
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_entry_category "
+            + "ON " + self.entry_table_name + " (category_id, date)"
         )
+        self.create_summary_table(cur)
+        self.create_search_table(cur)
 
-    def drop_table(self):
-        con, cur = self.start_connection()
-        cur.execute("DROP TABLE IF EXISTS " + self.category_table_name)
-        cur.execute("DROP TABLE IF EXISTS " + self.entry_table_name)
-        self.end_connection(con)
+    def create_summary_table(self, cur):
+        """
+        Create the month summary table and the triggers which keep it up to date.
+        Per month and category it holds the number of entries, the sum of the incomes
+        and the sum of the expenses, so month lists and totals don't have to read the entries.
+        """
+
+        cur.execute(
+            "CREATE TABLE IF NOT EXISTS "
+            + self.summary_table_name
+            + " ("
+            + "month TEXT NOT NULL, "  # yyyy-mm
+            + "category_id INTEGER NOT NULL, "
+            + "count INTEGER NOT NULL DEFAULT 0, "
+            + "income INTEGER NOT NULL DEFAULT 0, "  # cents, >= 0
+            + "expense INTEGER NOT NULL DEFAULT 0, "  # cents, <= 0
+            + "PRIMARY KEY (month, category_id)"
+            + ") WITHOUT ROWID"
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_month_summary_category "
+            + "ON " + self.summary_table_name + " (category_id)"
+        )
+
+        # add entry to summary
+        add_new = (
+            f"INSERT INTO {self.summary_table_name} (month, category_id, count, income, expense) "
+            f"VALUES (substr(NEW.date, 1, 7), NEW.category_id, 1, max(NEW.value, 0), min(NEW.value, 0)) "
+            f"ON CONFLICT (month, category_id) DO UPDATE SET "
+            f"count = count + 1, income = income + excluded.income, expense = expense + excluded.expense; "
+        )
+        # remove entry from summary, drop rows without entries
+        remove_old = (
+            f"UPDATE {self.summary_table_name} "
+            f"SET count = count - 1, income = income - max(OLD.value, 0), expense = expense - min(OLD.value, 0) "
+            f"WHERE month = substr(OLD.date, 1, 7) AND category_id = OLD.category_id; "
+            f"DELETE FROM {self.summary_table_name} "
+            f"WHERE month = substr(OLD.date, 1, 7) AND category_id = OLD.category_id AND count <= 0; "
+        )
+
+        cur.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{self.entry_table_name}_insert_summary "
+            f"AFTER INSERT ON {self.entry_table_name} BEGIN {add_new} END"
+        )
+        cur.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{self.entry_table_name}_delete_summary "
+            f"AFTER DELETE ON {self.entry_table_name} BEGIN {remove_old} END"
+        )
+        cur.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{self.entry_table_name}_update_summary "
+            f"AFTER UPDATE OF category_id, value, date ON {self.entry_table_name} BEGIN {remove_old} {add_new} END"
+        )
+
+    def create_search_table(self, cur) -> bool:
+        """
+        Create the full-text search table over the entry names and category names
+        and the triggers which keep it in sync with the entries and categories.
+        The rowid of the search table is the id of the entry.
+
+        :return: True if created, False if the sqlite build has no FTS5
+        """
+
+        try:
+            cur.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.search_table_name} "
+                f"USING fts5(name, category, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+
+        except sqlite3.OperationalError as fts_err:
+            loghandler.write_log(self.PATH_LOGFILE, f"FTS5 NOT AVAILABLE, search falls back to LIKE: {str(fts_err)}",
+                                 level=loghandler.WARNING)
+            self._search_table_available[self.path_db] = False
+            return False
+
+        add_new = (
+            f"INSERT INTO {self.search_table_name} (rowid, name, category) "
+            f"SELECT NEW.id, NEW.name, category FROM {self.category_table_name} WHERE id = NEW.category_id; "
+        )
+        remove_old = f"DELETE FROM {self.search_table_name} WHERE rowid = OLD.id; "
+
+        cur.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{self.entry_table_name}_insert_search "
+            f"AFTER INSERT ON {self.entry_table_name} BEGIN {add_new} END"
+        )
+        cur.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{self.entry_table_name}_delete_search "
+            f"AFTER DELETE ON {self.entry_table_name} BEGIN {remove_old} END"
+        )
+        cur.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{self.entry_table_name}_update_search "
+            f"AFTER UPDATE OF id, name, category_id ON {self.entry_table_name} BEGIN {remove_old} {add_new} END"
+        )
+        # renamed category: update the entries of the category (idx_entry_category)
+        cur.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{self.category_table_name}_update_search "
+            f"AFTER UPDATE OF category ON {self.category_table_name} BEGIN "
+            f"UPDATE {self.search_table_name} SET category = NEW.category "
+            f"WHERE rowid IN (SELECT id FROM {self.entry_table_name} WHERE category_id = NEW.id); "
+            f"END"
+        )
+
+        self._search_table_available[self.path_db] = True
+        return True
+
+    @timed(rows=lambda nr: max(nr, 0))
+    def rebuild_search_table(self) -> int:
+        """
+        Recompute the full-text search table from the entries, e.g. to repair it.
+
+        :return: number of indexed entries, -1 on error or without FTS5
+        """
+
+        try:
+            with self.transaction() as cur:
+                if not self.has_search_table(cur):
+                    return -1
+                return self._rebuild_search_table(cur)
+
+        except Exception as rebuild_err:
+            loghandler.write_log(self.PATH_LOGFILE, 'SQL REBUILD SEARCH TABLE ERROR: ' + str(rebuild_err),
+                                 print_log=True, level=loghandler.ERROR)
+            return -1
+
+    def _rebuild_search_table(self, cur) -> int:
+        cur.execute(f"DELETE FROM {self.search_table_name}")
+        cur.execute(
+            f"INSERT INTO {self.search_table_name} (rowid, name, category) "
+            f"SELECT e.id, e.name, c.category "
+            f"FROM {self.entry_table_name} AS e "
+            f"JOIN {self.category_table_name} AS c ON c.id = e.category_id"
+        )
+        return cur.rowcount
+
+    def has_search_table(self, cur=None) -> bool:
+        """ True if the db file has the full-text search table, checked once per db path. """
+
+        available = self._search_table_available.get(self.path_db)
+        if available is None:
+            available = self.table_exists(cur or self.cursor(), self.search_table_name)
+            self._search_table_available[self.path_db] = available
+        return available
+
+    @timed(rows=lambda nr: max(nr, 0))
+    def rebuild_month_summary(self) -> int:
+        """
+        Recompute the month summary table from the entries, e.g. to repair it.
+
+        :return: number of summary rows, -1 on error
+        """
+
+        try:
+            with self.transaction() as cur:
+                return self._rebuild_month_summary(cur)
+
+        except Exception as rebuild_err:
+            loghandler.write_log(self.PATH_LOGFILE, 'SQL REBUILD MONTH SUMMARY ERROR: ' + str(rebuild_err),
+                                 print_log=True, level=loghandler.ERROR)
+            return -1
+
+    def _rebuild_month_summary(self, cur) -> int:
+        cur.execute(f"DELETE FROM {self.summary_table_name}")
+        cur.execute(
+            f"INSERT INTO {self.summary_table_name} (month, category_id, count, income, expense) "
+            f"SELECT substr(date, 1, 7), category_id, COUNT(*), SUM(max(value, 0)), SUM(min(value, 0)) "
+            f"FROM {self.entry_table_name} "
+            f"GROUP BY substr(date, 1, 7), category_id"
+        )
+        return cur.rowcount
+
+    def migrate_schema(self, cur, schema_version: int):
+        """
+        Upgrade the tables of an existing db file to the current schema.
+        Call inside of a transaction, so a failed migration leaves the db file untouched.
+
+        :param cur: cursor inside of a transaction
+        :param schema_version: PRAGMA user_version of the db file; 0 for files written before versioning (v1)
+        """
+
+        if schema_version < 2:
+            self._migrate_v1_to_v2(cur)
+        if schema_version < 3:
+            self.create_summary_table(cur)
+            self._rebuild_month_summary(cur)
+        if schema_version < 4:
+            self.create_summary_table(cur)  # adds idx_month_summary_category
+        if schema_version < 5:
+            if self.create_search_table(cur):
+                self._rebuild_search_table(cur)
+
+        loghandler.write_log(
+            self.PATH_LOGFILE,
+            f"Migrated database schema from version {schema_version} to {self.SCHEMA_VERSION};",
+            print_log=True,
+        )
+
+    def _migrate_v1_to_v2(self, cur):
+        """
+        v1: all columns TEXT, entry.category_id references the category ROWID as text.
+        v2: INTEGER foreign key with ON DELETE CASCADE, value in integer cents, indexed ISO date.
+        """
+
+        cur.execute(f"ALTER TABLE {self.category_table_name} RENAME TO {self.category_table_name}_v1")
+        cur.execute(f"ALTER TABLE {self.entry_table_name} RENAME TO {self.entry_table_name}_v1")
+
+        self.create_table(cur)
+
+        # keep the ids, so the entries still point to the same category
+        cur.execute(
+            f"INSERT INTO {self.category_table_name} (id, category) "
+            f"SELECT ROWID, category FROM {self.category_table_name}_v1 WHERE category IS NOT NULL"
+        )
+
+        # convert in python with to_cents and the date check of import_all, so every write path rounds the same way
+        category_ids = {row[0] for row in cur.execute(f"SELECT id FROM {self.category_table_name}")}
+        entries = []
+        unmigrated = []
+        for rowid, category_id, name, value, date in cur.execute(
+            f"SELECT ROWID, category_id, name, value, date FROM {self.entry_table_name}_v1"
+        ).fetchall():
+            try:
+                if category_id is None or int(category_id) not in category_ids:
+                    raise ValueError(f"Category id '{category_id}' does not exist")
+                entries.append((
+                    rowid,
+                    int(category_id),
+                    name or '',
+                    to_cents(value),
+                    datetime.date.fromisoformat(str(date)[:10]).isoformat(),
+                ))
+            except Exception as convert_err:
+                unmigrated.append((rowid, category_id, name, value, date, str(convert_err)))
+
+        cur.executemany(
+            f"INSERT INTO {self.entry_table_name} (id, category_id, name, value, date) VALUES (?, ?, ?, ?, ?)",
+            entries
+        )
+
+        # entries which can't be migrated weren't displayed before either; keep them, so they can be fixed by hand
+        if unmigrated:
+            cur.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.entry_table_name}_v1_unmigrated "
+                f"(id INTEGER PRIMARY KEY, category_id TEXT, name TEXT, value TEXT, date TEXT, error TEXT)"
+            )
+            cur.executemany(
+                f"INSERT OR REPLACE INTO {self.entry_table_name}_v1_unmigrated "
+                f"(id, category_id, name, value, date, error) VALUES (?, ?, ?, ?, ?, ?)",
+                unmigrated
+            )
+            loghandler.write_log(
+                self.PATH_LOGFILE,
+                f"SQL MIGRATION: moved {len(unmigrated)} entries without valid category, value or date "
+                f"to table '{self.entry_table_name}_v1_unmigrated';",
+                print_log=True,
+                level=loghandler.WARNING,
+            )
 
+        cur.execute(f"DROP TABLE {self.entry_table_name}_v1")
+        cur.execute(f"DROP TABLE {self.category_table_name}_v1")
+
+    def drop_table(self):
+        with self.transaction() as cur:
+            cur.execute("DROP TABLE IF EXISTS " + self.summary_table_name)
+            cur.execute("DROP TABLE IF EXISTS " + self.search_table_name)
+            cur.execute("DROP TABLE IF EXISTS " + self.entry_table_name)
+            cur.execute("DROP TABLE IF EXISTS " + self.category_table_name)
+        self.invalidate_category_cache()
+        self._search_table_available.pop(self.path_db, None)
+
+    @timed
     def get_available_dates(self) -> list:
         """
         Returns a list of all the month dates in the database.
+        Read from the month summary table, i.e. one row per month and category.
 
         :return: list e.g.: ['yyyy-mm', 'yyyy-mm']
         """
 
-        con, cur = self.start_connection()
+        cur = self.cursor()
 
         try:
             cur.execute(
-                "SELECT SUBSTR(date, 1, 7) as d "
-                + "FROM " + self.entry_table_name
-                + " GROUP BY d"
-                + " ORDER BY d ASC"
+                "SELECT month "
+                + "FROM " + self.summary_table_name
+                + " GROUP BY month"
+                + " ORDER BY month ASC"
             )
             # [['2022-01',], ['2022-02',]]
             dates = [d[0] for d in cur.fetchall()]
 
         except Exception as sql_get_dates_err:
-            loghandler.write_log(self.PATH_LOGFILE, 'SQL GET DATES ERROR: ' + str(sql_get_dates_err), print_log=True)
+            loghandler.write_log(self.PATH_LOGFILE, 'SQL GET DATES ERROR: ' + str(sql_get_dates_err), print_log=True, level=loghandler.ERROR)
             dates = []
 
-        self.end_connection(con)
-
         return dates
 
+    @timed(rows=no_rows)
     def add_element(self, category, name, value, date):
+        """
+        Add an entry.
 
-        # connect
-        con, cur = self.start_connection()
+        :param category: name of an existing category
+        :param name: item name
+        :param value: money value, e.g. '-12.50'; stored as integer cents
+        :param date: date with format YYYY-MM-DD
+        :return: True if the entry was added, False on error
+        """
 
         try:
+            value_cents = to_cents(value)
+
             # check if category already exists
-            cur.execute(
-                "SELECT c.rowid "
-                "FROM " + self.category_table_name + " AS c "
-                + 'WHERE c.category="' + str(category) + '"'
-            )
-            category_id = cur.fetchall()[0][0]
-            cur.execute(
-                "INSERT OR IGNORE INTO " + self.entry_table_name + " AS e "
-                + "VALUES ("
-                + '"' + str(category_id) + '",'
-                + '"' + str(name) + '",'
-                + '"' + str(value) + '",'
-                + '"' + str(date) + '"'
-                + ");"
-            )
+            category_id = self.get_category_id(category)
+            if category_id is None:
+                raise ValueError(f"Category '{category}' does not exist")
+
+            # raises ValueError on a date sqlite can't store in the date column, see import_all
+            date_iso = datetime.date.fromisoformat(str(date)[:10]).isoformat()
+
+            with self.transaction() as cur:
+                cur.execute(
+                    "INSERT INTO " + self.entry_table_name + " "
+                    + "(category_id, name, value, date) "
+                    + "VALUES (?, ?, ?, ?)",
+                    (category_id, str(name), value_cents, date_iso)
+                )
         except Exception as add_err:
-            loghandler.write_log(self.PATH_LOGFILE, 'SQL ADD ENTRY ERROR: ' + str(add_err), print_log=True)
+            loghandler.write_log(self.PATH_LOGFILE, 'SQL ADD ENTRY ERROR: ' + str(add_err), print_log=True, level=loghandler.ERROR)
+            return False
 
-        # commit
-        self.end_connection(con)
+        return True
 
-    def get_entries_by_date_new(self, date_yyyymm):
+    @staticmethod
+    def month_range(date_yyyymm: str) -> tuple:
         """
-        Get entries by date
+        Get the half-open date range of a month, so a month can be selected with plain
+        range predicates (start <= date < end) which can use the date index.
+
+        :param date_yyyymm: date with format YYYY-MM
+        :return: tuple ('yyyy-mm-01', 'yyyy-mm-01' of next month)
+        :raises ValueError: if date_yyyymm has a wrong format
+        """
+
+        start_y, start_m = [int(d) for d in date_yyyymm.split('-')]
+        if not 1 <= start_m <= 12:
+            raise ValueError(f"Invalid month in '{date_yyyymm}'")
+
+        # calculate end year/month
+        end_y, end_m = (start_y + 1, 1) if start_m == 12 else (start_y, start_m + 1)
+
+        return f"{start_y:04d}-{start_m:02d}-01", f"{end_y:04d}-{end_m:02d}-01"
+
+    @timed
+    def get_entries_by_date(self, date_yyyymm):
+        """
+        Get entries by date.
+        Results are cached until the next write, so revisiting a month doesn't query the db.
 
         :param date_yyyymm: date with format YYYY-MM
         :return: list with entries, [] on error
         """
 
-        # calculate start year/month and end year/month
+        # calculate start and end date
         try:
-            start_y, start_m = [int(d) for d in date_yyyymm.split('-')]
-            # end_m = (start_m + 1) % 12
-            # end_y = start_y if start_m < end_m else (start_y + 1)
-            end_m = (
-                12
-                if start_m + 1 == 0
-                else 1
-                if start_m + 1 == 13
-                else start_m + 1
-            )
-            end_y = start_y + 1 if start_m + 1 == 13 else start_y
+            start_date, end_date = self.month_range(date_yyyymm)
 
         except Exception as date_err:
             err_msg = f"GET ENTRY BY DATE FORMAT ERROR: {str(date_err)}"
-            loghandler.write_log(self.PATH_LOGFILE, err_msg)
+            loghandler.write_log(self.PATH_LOGFILE, err_msg, level=loghandler.ERROR)
             print(err_msg)
             return []
 
-        con, cur = self.start_connection()
+        # cached result of the current write generation
+        cache_key = ('month', date_yyyymm)
+        generation = self._get_generation()
+        entries = self._get_cached(cache_key, generation)
+        if entries is not None:
+            return list(entries)
 
-        # "SELECT substr(e.date, 9), e.name, c.category, e.value, substr(e.ROWID, 0) "
-        sql_statement = "SELECT substr(e.date, 9), e.name, c.category, substr(e.value), e.ROWID " + \
-                        "FROM category as c " + \
-                        "JOIN entry as e " + \
-                        "ON e.category_id = c.ROWID " + \
-                        "WHERE julianday('" + str(start_y).zfill(4) + "-" + str(start_m).zfill(2) + "-01') " + \
-                        "<= julianday(e.date) " + \
-                        "AND julianday(e.date) < julianday('" + str(end_y).zfill(4) + "-" + str(end_m).zfill(
-            2) + "-01') " + \
+        cur = self.cursor()
+
+        sql_statement = "SELECT substr(e.date, 9), e.name, c.category, printf('%.2f', e.value / 100.0), e.ROWID " + \
+                        "FROM entry as e " + \
+                        "JOIN category as c " + \
+                        "ON c.id = e.category_id " + \
+                        "WHERE e.date >= ? AND e.date < ? " + \
                         "ORDER BY e.date ASC"
-        print(sql_statement)
+        loghandler.debug(self.PATH_LOGFILE, "SQL: %s", sql_statement)
 
         try:
-            cur.execute(sql_statement)
+            cur.execute(sql_statement, (start_date, end_date))
             # [['category', 'item', '-100.00', '2022-01-01', 0], [...]]
             entries = cur.fetchall()
 
         except Exception as get_entry_by_date_err:
-            loghandler.write_log(self.PATH_LOGFILE, 'SQL GET ENTRY BY DATE ERROR: ' + str(get_entry_by_date_err),
-                                 print_log=True)
-            entries = []
+            loghandler.write_log(self.PATH_LOGFILE, 'SQL GET ENTRY BY DATE ERROR: ' + str(get_entry_by_date_err), print_log=True, level=loghandler.ERROR)
+            return []
+
+        self._put_cached(cache_key, generation, entries)
+
+        return list(entries)
+
+    # default number of entries per page
+    ENTRY_PAGE_SIZE = 100
+
+    @timed(rows=lambda page: len(page[0]))
+    def get_entries_page(self, date_yyyymm: str, after=None, limit=None) -> tuple:
+        """
+        Get one page of the entries of a month, ordered by date and rowid.
+        Uses keyset pagination: the next page starts after the (date, rowid) of the last row,
+        so every page is one index search, no matter how deep it is.
+
+        :param date_yyyymm: date with format YYYY-MM
+        :param after: keyset of the previous page as returned by this function, None for the first page
+        :param limit: number of entries per page, default ENTRY_PAGE_SIZE
+        :return: tuple (list with entries like get_entries_by_date, keyset of the next page or None if this is the last page),
+            ([], None) on error
+        """
+
+        limit = limit or self.ENTRY_PAGE_SIZE
+
+        # calculate start and end date
+        try:
+            start_date, end_date = self.month_range(date_yyyymm)
+
+        except Exception as date_err:
+            err_msg = f"GET ENTRY PAGE FORMAT ERROR: {str(date_err)}"
+            loghandler.write_log(self.PATH_LOGFILE, err_msg, level=loghandler.ERROR)
+            print(err_msg)
+            return [], None
+
+        # cached result of the current write generation
+        cache_key = ('page', date_yyyymm, after, limit)
+        generation = self._get_generation()
+        page = self._get_cached(cache_key, generation)
+        if page is not None:
+            return list(page[0]), page[1]
+
+        after_date, after_rowid = after if after is not None else (start_date, 0)
 
-        self.end_connection(con)
+        cur = self.cursor()
+
+        try:
+            cur.execute(
+                "SELECT substr(e.date, 9), e.name, c.category, printf('%.2f', e.value / 100.0), e.ROWID, e.date "
+                + "FROM entry as e "
+                + "JOIN category as c "
+                + "ON c.id = e.category_id "
+                + "WHERE (e.date, e.ROWID) > (?, ?) AND e.date < ? "
+                + "ORDER BY e.date ASC, e.ROWID ASC "
+                + "LIMIT ?",
+                (after_date, after_rowid, end_date, limit)
+            )
+            rows = cur.fetchall()
+
+        except Exception as get_entry_page_err:
+            loghandler.write_log(self.PATH_LOGFILE, 'SQL GET ENTRY PAGE ERROR: ' + str(get_entry_page_err), print_log=True, level=loghandler.ERROR)
+            return [], None
+
+        # [['01', 'item', 'category', '-100.00', 1], [...]]
+        entries = [row[:5] for row in rows]
+        # keyset of the last row: (date, rowid)
+        next_after = (rows[-1][5], rows[-1][4]) if len(rows) == limit else None
+
+        self._put_cached(cache_key, generation, (entries, next_after))
+
+        return list(entries), next_after
+
+    # default number of search results
+    SEARCH_LIMIT = 100
+
+    @timed
+    def search_entries(self, query: str, limit=None) -> list:
+        """
+        Search the entries by name and category, newest first.
+        Every word of the query has to match the beginning of a word in the name or category,
+        e.g. 'gro sto' finds 'Grocery store'. Uses the full-text search table, or a LIKE scan
+        if the sqlite build has no FTS5.
+
+        :param query: search text
+        :param limit: max number of results, default SEARCH_LIMIT
+        :return: list with entries: [('yyyy-mm-dd', 'name', 'category', '-1.00', rowid), ...], [] on error
+        """
+
+        limit = limit or self.SEARCH_LIMIT
+        words = query.split()
+        if not words:
+            return []
+
+        cur = self.cursor()
+
+        try:
+            if self.has_search_table(cur):
+                # every word as quoted prefix term: "gro"* "sto"*
+                match = " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+                cur.execute(
+                    "SELECT e.date, e.name, c.category, printf('%.2f', e.value / 100.0), e.ROWID "
+                    + f"FROM {self.search_table_name} AS s "
+                    + "JOIN entry AS e ON e.id = s.rowid "
+                    + "JOIN category AS c ON c.id = e.category_id "
+                    + f"WHERE {self.search_table_name} MATCH ? "
+                    + "ORDER BY e.date DESC, e.ROWID DESC "
+                    + "LIMIT ?",
+                    (match, limit)
+                )
+            else:
+                # fallback: every word has to be contained in the name or category
+                like_words = ['%' + word.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                              for word in words]
+                condition = " AND ".join(["(e.name LIKE ? ESCAPE '\\' OR c.category LIKE ? ESCAPE '\\')"] * len(words))
+                cur.execute(
+                    "SELECT e.date, e.name, c.category, printf('%.2f', e.value / 100.0), e.ROWID "
+                    + "FROM entry AS e "
+                    + "JOIN category AS c ON c.id = e.category_id "
+                    + f"WHERE {condition} "
+                    + "ORDER BY e.date DESC, e.ROWID DESC "
+                    + "LIMIT ?",
+                    [arg for like_word in like_words for arg in (like_word, like_word)] + [limit]
+                )
+            entries = cur.fetchall()
+
+        except Exception as search_err:
+            loghandler.write_log(self.PATH_LOGFILE, 'SQL SEARCH ENTRIES ERROR: ' + str(search_err), print_log=True, level=loghandler.ERROR)
+            return []
 
         return entries
 
-    def get_entries_by_date(self, date_yyyymm):
+    def _get_generation(self) -> int:
+        """
+        Current write generation of the db. Read it once before a cached query and pass it
+        to _get_cached and _put_cached, so a result read while another thread writes is
+        stored under the generation it was read in and never served after the write.
         """
-        Get entries by date
+        return self._write_generation.get(self.path_db, 0)
+
+    def _get_cached(self, key, generation: int):
+        """
+        Get a cached query result of a write generation.
+
+        :param key: tuple identifying the query and its arguments
+        :param generation: write generation, see _get_generation
+        :return: cached result, None if not cached
+        """
+
+        cache_key = (self.path_db, generation) + key
+        with self._result_cache_lock:
+            result = self._result_cache.get(cache_key)
+            if result is not None:
+                self._result_cache.move_to_end(cache_key)
+        return result
+
+    @classmethod
+    def clear_result_cache(cls):
+        """ Drop all cached query results, e.g. to measure uncached queries. """
+
+        with cls._result_cache_lock:
+            cls._result_cache.clear()
+
+    def _put_cached(self, key, generation: int, result):
+        """
+        Cache a query result for a write generation, drop the least recently used ones.
+        Results of older generations are never hit again, so they drop out by themselves.
+
+        :param key: tuple identifying the query and its arguments
+        :param generation: write generation read before the query, see _get_generation
+        :param result: query result
+        """
+
+        cache_key = (self.path_db, generation) + key
+        with self._result_cache_lock:
+            self._result_cache[cache_key] = result
+            while len(self._result_cache) > self.RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+
+    @timed(rows=no_rows)
+    def get_month_total(self, date_yyyymm: str) -> int:
+        """
+        Sum of the values of all entries of a month.
+        Read from the month summary table.
 
         :param date_yyyymm: date with format YYYY-MM
-        :return: list with entries, [] on error
+        :return: int cents, 0 on error
         """
 
-        # calculate start year/month and end year/month
+        cur = self.cursor()
+
         try:
-            start_y, start_m = [int(d) for d in date_yyyymm.split('-')]
-            # end_m = (start_m + 1) % 12
-            # end_y = start_y if start_m < end_m else (start_y + 1)
-            end_m = (
-                12
-                if start_m + 1 == 0
-                else 1
-                if start_m + 1 == 13
-                else start_m + 1
+            cur.execute(
+                "SELECT COALESCE(SUM(income + expense), 0) "
+                + "FROM " + self.summary_table_name
+                + " WHERE month = ?",
+                (str(date_yyyymm),)
             )
-            end_y = start_y + 1 if start_m + 1 == 13 else start_y
+            total = cur.fetchone()[0]
 
-        except Exception as date_err:
-            err_msg = f"GET ENTRY BY DATE FORMAT ERROR: {str(date_err)}"
-            loghandler.write_log(self.PATH_LOGFILE, err_msg)
+        except Exception as get_total_err:
+            loghandler.write_log(self.PATH_LOGFILE, 'SQL GET MONTH TOTAL ERROR: ' + str(get_total_err),
+                                 print_log=True, level=loghandler.ERROR)
+            total = 0
+
+        return total
+
+    # group key per group_by of get_totals: (on the month summary, on the entries); week needs the entries
+    TOTALS_GROUP_KEYS = {
+        "month": ("s.month", "substr(e.date, 1, 7)"),
+        "year": ("substr(s.month, 1, 4)", "substr(e.date, 1, 4)"),
+        "category": ("c.category", "c.category"),
+        "week": (None, "strftime('%Y-W%W', e.date)"),  # weeks start on monday
+    }
+
+    @timed
+    def get_totals(self, start: str, end: str, group_by: str = "month") -> list:
+        """
+        Number of entries, incomes and expenses in a date range, grouped in one SQL query.
+        Ranges of whole months are read from the month summary table, other ranges from the entries.
+
+        Usage, yearly category breakdown:
+            get_totals('2023-01-01', '2024-01-01', group_by='category')
+
+        :param start: first date of the range, format yyyy-mm-dd
+        :param end: date after the range (exclusive), format yyyy-mm-dd
+        :param group_by: 'month' (yyyy-mm), 'year' (yyyy), 'category' (name) or 'week' (yyyy-Www)
+        :return: list ordered by key: [(key, count, income cents, expense cents), ...]; [] on error
+        """
+
+        try:
+            if group_by not in self.TOTALS_GROUP_KEYS:
+                raise ValueError(f"Invalid group_by '{group_by}'")
+            start = datetime.date.fromisoformat(str(start)).isoformat()
+            end = datetime.date.fromisoformat(str(end)).isoformat()
+
+        except Exception as totals_arg_err:
+            err_msg = f"GET TOTALS ARGUMENT ERROR: {str(totals_arg_err)}"
+            loghandler.write_log(self.PATH_LOGFILE, err_msg, level=loghandler.ERROR)
             print(err_msg)
             return []
 
-        con, cur = self.start_connection()
+        # cached result of the current write generation
+        cache_key = ('totals', start, end, group_by)
+        generation = self._get_generation()
+        totals = self._get_cached(cache_key, generation)
+        if totals is not None:
+            return list(totals)
 
-        # "SELECT substr(e.date, 9), e.name, c.category, e.value, substr(e.ROWID, 0) "
-        sql_statement = "SELECT substr(e.date, 9), e.name, c.category, e.value, e.ROWID " + "FROM category as c " + \
-                        "JOIN entry as e " + \
-                        "ON e.category_id = c.ROWID " + \
-                        "WHERE julianday('" + str(start_y).zfill(4) + "-" + str(start_m).zfill(2) + "-01') " + \
-                        "<= julianday(e.date) " + \
-                        "AND julianday(e.date) < julianday('" + str(end_y).zfill(4) + "-" + str(end_m).zfill(2) + "-01') " + \
-                        "ORDER BY e.date ASC"
-        print(sql_statement)
+        summary_key, entry_key = self.TOTALS_GROUP_KEYS[group_by]
+
+        cur = self.cursor()
 
         try:
-            cur.execute(sql_statement)
-            # [['category', 'item', '-100.00', '2022-01-01', 0], [...]]
-            entries = cur.fetchall()
+            if summary_key is not None and start.endswith("-01") and end.endswith("-01"):
+                # whole months: sum up the month summary rows
+                cur.execute(
+                    f"SELECT {summary_key} AS key, SUM(s.count), SUM(s.income), SUM(s.expense) "
+                    + "FROM " + self.summary_table_name + " AS s "
+                    + "JOIN " + self.category_table_name + " AS c ON c.id = s.category_id "
+                    + "WHERE s.month >= ? AND s.month < ? "
+                    + "GROUP BY key "
+                    + "ORDER BY key",
+                    (start[:7], end[:7])
+                )
+            else:
+                # any other range: group the entries of the range (idx_entry_date)
+                cur.execute(
+                    f"SELECT {entry_key} AS key, COUNT(*), SUM(max(e.value, 0)), SUM(min(e.value, 0)) "
+                    + "FROM " + self.entry_table_name + " AS e "
+                    + "JOIN " + self.category_table_name + " AS c ON c.id = e.category_id "
+                    + "WHERE e.date >= ? AND e.date < ? "
+                    + "GROUP BY key "
+                    + "ORDER BY key",
+                    (start, end)
+                )
+            totals = cur.fetchall()
+
+        except Exception as get_totals_err:
+            loghandler.write_log(self.PATH_LOGFILE, 'SQL GET TOTALS ERROR: ' + str(get_totals_err), print_log=True, level=loghandler.ERROR)
+            return []
 
-        except Exception as get_entry_by_date_err:
-            loghandler.write_log(self.PATH_LOGFILE, 'SQL GET ENTRY BY DATE ERROR: ' + str(get_entry_by_date_err), print_log=True)
-            entries = []
+        self._put_cached(cache_key, generation, totals)
 
-        self.end_connection(con)
+        return list(totals)
 
-        return entries
+    @timed
+    def count_entries_by_category(self, categories: list) -> dict:
+        """
+        Number of entries and sum of their values per category, with one grouped query
+        on the month summary table.
+
+        :param categories: list of category names
+        :return: dict {'category': (count, total cents)}, categories without entries are missing; {} on error
+        """
+
+        categories = [str(c) for c in categories if c]
+        if not categories:
+            return {}
 
+        cur = self.cursor()
+
+        try:
+            cur.execute(
+                "SELECT c.category, SUM(s.count), SUM(s.income + s.expense) "
+                + "FROM " + self.category_table_name + " AS c "
+                + "JOIN " + self.summary_table_name + " AS s "
+                + "ON s.category_id = c.id "
+                + "WHERE c.category IN (" + ", ".join(["?"] * len(categories)) + ") "
+                + "GROUP BY c.category",
+                categories
+            )
+            counts = {category: (count, total) for category, count, total in cur.fetchall()}
+
+        except Exception as count_err:
+            loghandler.write_log(self.PATH_LOGFILE, 'SQL COUNT BY CATEGORY ERROR: ' + str(count_err),
+                                 print_log=True, level=loghandler.ERROR)
+            counts = {}
+
+        return counts
+
+    @timed
+    def count_entries_by_month(self, months: list) -> dict:
+        """
+        Number of entries and sum of their values per month, with one grouped query
+        on the month summary table.
+
+        :param months: list of dates with format YYYY-MM
+        :return: dict {'yyyy-mm': (count, total cents)}, months without entries are missing; {} on error
+        """
+
+        months = [str(m) for m in months if m]
+        if not months:
+            return {}
+
+        cur = self.cursor()
+
+        try:
+            cur.execute(
+                "SELECT month, SUM(count), SUM(income + expense) "
+                + "FROM " + self.summary_table_name
+                + " WHERE month IN (" + ", ".join(["?"] * len(months)) + ")"
+                + " GROUP BY month",
+                months
+            )
+            counts = {month: (count, total) for month, count, total in cur.fetchall()}
+
+        except Exception as count_err:
+            loghandler.write_log(self.PATH_LOGFILE, 'SQL COUNT BY MONTH ERROR: ' + str(count_err),
+                                 print_log=True, level=loghandler.ERROR)
+            counts = {}
+
+        return counts
+
+    @timed
     def get_entries_by_category(self, category: str, full_date=False) -> list:
+        """
+        Get the entries of a category, ordered by date.
 
-        con, cur = self.start_connection()
+        :param category: category name
+        :param full_date: True for dates yyyy-mm-dd, False for the day of month only
+        :return: list with entries, [] on error
+        """
+
+        cur = self.cursor()
 
         date_restriction = "e.date" if full_date else "substr(e.date, 9)"
 
-        sql_statement = f"SELECT {date_restriction}, e.name, c.category, e.value, e.ROWID " + "FROM category as c " + \
-                        f"JOIN entry as e " + \
-                        f"ON e.category_id = c.ROWID " + \
-                        f"WHERE c.category = '{category}' " + \
-                        f"ORDER BY e.date ASC"
-        print(sql_statement)
+        sql_statement = f"SELECT {date_restriction}, e.name, c.category, printf('%.2f', e.value / 100.0), e.ROWID " + \
+                        "FROM category as c " + \
+                        "JOIN entry as e " + \
+                        "ON e.category_id = c.id " + \
+                        "WHERE c.category = ? " + \
+                        "ORDER BY e.date ASC"
+        loghandler.debug(self.PATH_LOGFILE, "SQL: %s", sql_statement)
         try:
-            cur.execute(sql_statement)
+            cur.execute(sql_statement, (str(category),))
             # [['category', 'item', '-100.00', '2022-01-01', 0], [...]]
             entries = cur.fetchall()
 
         except Exception as get_entry_by_cat_err:
-            loghandler.write_log(self.PATH_LOGFILE, 'SQL GET ENTRY BY CATEGORY ERROR: ' + str(get_entry_by_cat_err), print_log=True)
+            loghandler.write_log(self.PATH_LOGFILE, 'SQL GET ENTRY BY CATEGORY ERROR: ' + str(get_entry_by_cat_err), print_log=True, level=loghandler.ERROR)
             entries = []
 
-        self.end_connection(con)
-
         return entries
 
+    @timed(rows=no_rows)
     def delete_entry(self, entry_id: int):
-        print('del at ', entry_id)
-
-        con, cur = self.start_connection()
+        loghandler.debug(self.PATH_LOGFILE, "Delete entry %s", entry_id)
 
         try:
-            cur.execute(
-                "DELETE FROM " + self.entry_table_name
-                + " WHERE rowid=" + str(entry_id)
-            )
+            with self.transaction() as cur:
+                cur.execute(
+                    "DELETE FROM " + self.entry_table_name
+                    + " WHERE id = ?",
+                    (int(entry_id),)
+                )
 
         except Exception as del_entry_err:
             loghandler.write_log(self.PATH_LOGFILE, 'SQL DELETE ENTRY ERROR: ' + str(del_entry_err),
-                                 print_log=True)
-
-        self.end_connection(con)
+                                 print_log=True, level=loghandler.ERROR)
 
     def del_month(self, date_yyyymm: str):
 
@@ -273,61 +1004,135 @@ class DataManagement:
         if not date_yyyymm:
             return
 
-        # get entries by date
-        entries_with_date = self.get_entries_by_date(date_yyyymm)
+        self.del_months([date_yyyymm])
 
-        # connect
-        con, cur = self.start_connection()
+    @timed(rows=lambda nr: max(nr, 0))
+    def del_months(self, months: list) -> int:
+        """
+        Delete all entries of the given months with one statement in one transaction.
+
+        :param months: list of dates with format YYYY-MM
+        :return: number of deleted entries, -1 on error
+        """
+
+        # do nothing if there are no months
+        months = [m for m in months if m]
+        if not months:
+            return 0
 
         try:
-            # delete category
-            cur.execute(f"DELETE FROM {self.entry_table_name} WHERE date LIKE '{date_yyyymm}%'")
+            # one date range per month: (date >= ? AND date < ?) OR (...)
+            ranges = [self.month_range(m) for m in months]
+
+            with self.transaction() as cur:
+                cur.execute(
+                    f"DELETE FROM {self.entry_table_name} WHERE "
+                    + " OR ".join(["(date >= ? AND date < ?)"] * len(ranges)),
+                    [d for date_range in ranges for d in date_range]
+                )
+                nr_entries = cur.rowcount
 
         except Exception as del_err:
-            loghandler.write_log(self.PATH_LOGFILE, 'SQL MONTH DELETE ERROR: %s' % str(del_err))
+            loghandler.write_log(self.PATH_LOGFILE, 'SQL MONTH DELETE ERROR: %s' % str(del_err), level=loghandler.ERROR)
+            return -1
 
-        # commit
-        self.end_connection(con)
+        return nr_entries
 
+    @timed(rows=no_rows)
     def add_category(self, category):
 
         # do nothing if category is empty
         if not category:
             return
 
-        # connect
-        con, cur = self.start_connection()
-
         try:
-            cur.execute(
-                "INSERT OR IGNORE INTO " + self.category_table_name + " "
-                + 'VALUES ("' + str(category) + '")'
-            )
+            with self.transaction() as cur:
+                cur.execute(
+                    "INSERT OR IGNORE INTO " + self.category_table_name + " (category) "
+                    + "VALUES (?)",
+                    (str(category),)
+                )
         except Exception as add_err:
-            loghandler.write_log(self.PATH_LOGFILE, 'SQL CATEGORY ADD ERROR: %s' % str(add_err))
+            loghandler.write_log(self.PATH_LOGFILE, 'SQL CATEGORY ADD ERROR: %s' % str(add_err), level=loghandler.ERROR)
+        finally:
+            self.invalidate_category_cache()
 
-        # commit
-        self.end_connection(con)
+    def _get_category_cache(self) -> dict:
+        """
+        Get the category name -> id dict, load it from the db if it's not cached.
 
-    def get_categories(self):
-        con, cur = self.start_connection()
+        :return: dict {'category': id} in order of creation
+        """
 
-        try:
+        category_ids = self._category_cache.get(self.path_db)
+        if category_ids is not None:
+            return category_ids
+
+        with self._category_cache_lock:
+            cur = self.cursor()
             cur.execute(
-                "SELECT category "
+                "SELECT category, id "
                 + "FROM " + self.category_table_name
-                # + " GROUP BY category"
-                # + " ORDER BY category ASC"
+                + " ORDER BY id ASC"
             )
-            # [['cat',], ['cat2',]]
-            categories = [c[0] for c in cur.fetchall()]
+            # {'cat': 1, 'cat2': 2}
+            category_ids = dict(cur.fetchall())
+            self._category_cache[self.path_db] = category_ids
+
+        return category_ids
+
+    def invalidate_category_cache(self):
+        """ Drop the cached categories, call after every change of the category table. """
+        self._category_cache.pop(self.path_db, None)
+
+    @timed(rows=no_rows)
+    def get_category_id(self, category: str):
+        """
+        Get the id of a category from the cache.
+
+        :param category: category name
+        :return: int id, None if the category doesn't exist
+        """
+
+        try:
+            return self._get_category_cache().get(str(category))
 
         except Exception as get_cat_err:
             loghandler.write_log(self.PATH_LOGFILE, 'SQL GET CATEGORY ERROR: ' + str(get_cat_err),
-                                 print_log=True)
-            categories = []
+                                 print_log=True, level=loghandler.ERROR)
+            return None
+
+    @timed
+    def get_category_ids(self) -> dict:
+        """
+        Get the ids of all categories from the cache.
+
+        :return: dict e.g.: {'cat': 1, 'cat2': 2}, a copy of the cache; {} on error
+        """
+
+        try:
+            return dict(self._get_category_cache())
+
+        except Exception as get_cat_err:
+            loghandler.write_log(self.PATH_LOGFILE, 'SQL GET CATEGORY ERROR: ' + str(get_cat_err),
+                                 print_log=True, level=loghandler.ERROR)
+            return {}
 
-        self.end_connection(con)
+    @timed
+    def get_categories(self):
+        """
+        Get all category names from the cache.
+
+        :return: list e.g.: ['cat', 'cat2']
+        """
+
+        try:
+            categories = list(self._get_category_cache().keys())
+
+        except Exception as get_cat_err:
+            loghandler.write_log(self.PATH_LOGFILE, 'SQL GET CATEGORY ERROR: ' + str(get_cat_err),
+                                 print_log=True, level=loghandler.ERROR)
+            categories = []
 
         return categories
 
@@ -337,72 +1142,229 @@ class DataManagement:
         if not category:
             return
 
-        # get entries by category
-        entries_with_category = self.get_entries_by_category(category)
+        self.del_categories([category])
 
-        # connect
-        con, cur = self.start_connection()
+    @timed(rows=lambda nr: max(nr[1], 0))
+    def del_categories(self, categories: list) -> tuple:
+        """
+        Delete categories and all their entries with set-based statements in one transaction.
 
-        try:
+        :param categories: list of category names
+        :return: tuple (number of deleted categories, number of deleted entries), (-1, -1) on error
+        """
 
-            # overwrite existing entries with category to delete with new category_id -1
-            for e in entries_with_category:
-                e_id = e[-1]
+        # do nothing if there are no categories
+        categories = [str(c) for c in categories if c]
+        if not categories:
+            return 0, 0
 
-                # cur.execute(f"UPDATE {self.entry_table_name} SET category_id = -1 WHERE ROWID = {e_id}")
-                cur.execute(f"DELETE FROM {self.entry_table_name} WHERE ROWID = {e_id}")
+        placeholders = ", ".join(["?"] * len(categories))
 
-            # delete category
-            cur.execute(f"DELETE FROM {self.category_table_name} WHERE category = '{category}'")
+        try:
+            with self.transaction() as cur:
+                # delete entries explicitly, the ON DELETE CASCADE would do it too but without a row count
+                cur.execute(
+                    f"DELETE FROM {self.entry_table_name} WHERE category_id IN "
+                    f"(SELECT id FROM {self.category_table_name} WHERE category IN ({placeholders}))",
+                    categories
+                )
+                nr_entries = cur.rowcount
+
+                # delete categories
+                cur.execute(
+                    f"DELETE FROM {self.category_table_name} WHERE category IN ({placeholders})",
+                    categories
+                )
+                nr_categories = cur.rowcount
 
         except Exception as del_err:
-            loghandler.write_log(self.PATH_LOGFILE, 'SQL CATEGORY DELETE ERROR: %s' % str(del_err))
+            loghandler.write_log(self.PATH_LOGFILE, 'SQL CATEGORY DELETE ERROR: %s' % str(del_err), level=loghandler.ERROR)
+            return -1, -1
+        finally:
+            self.invalidate_category_cache()
+
+        return nr_categories, nr_entries
+
+    # rows fetched at once while exporting
+    EXPORT_FETCH_SIZE = 500
+
+    def iter_export_rows(self):
+        """
+        Iterate over all categories and their entries with one ordered query,
+        fetching EXPORT_FETCH_SIZE rows at a time.
+
+        :return: generator of (category, entry) with entry ['yyyy-mm-dd', 'name', 'category', '-1.00', rowid],
+            entry is None for categories without entries
+        """
 
-        # commit
-        self.end_connection(con)
+        cur = self.cursor()
+        cur.execute(
+            "SELECT c.category, e.date, e.name, c.category, printf('%.2f', e.value / 100.0), e.id "
+            + "FROM " + self.category_table_name + " AS c "
+            + "LEFT JOIN " + self.entry_table_name + " AS e "
+            + "ON e.category_id = c.id "
+            + "ORDER BY c.id, e.date, e.id"
+        )
+
+        while True:
+            rows = cur.fetchmany(self.EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield row[0], (list(row[1:]) if row[5] is not None else None)
 
+    @timed(rows=lambda data: sum(map(len, data.values())) if data else 0)
     def export_all(self):
         """ Export all db values from all tables sorted by category """
 
         export_data = {}
 
-        # get categories
-        categories = self.get_categories()
-        if not categories:
-            return None
+        try:
+            for category, entry in self.iter_export_rows():
+                category_entries = export_data.setdefault(category, [])
+                if entry is not None:
+                    category_entries.append(entry)
 
-        # connect
-        con, cur = self.start_connection()
+        except Exception as export_err:
+            loghandler.write_log(self.PATH_LOGFILE, 'Export all ERROR: %s' % str(export_err), level=loghandler.ERROR)
 
-        try:
-            # get all values by category
-            for category in categories:
-                export_data[category] = self.get_entries_by_category(category, full_date=True)
+        return export_data or None
 
-        except Exception as del_err:
-            loghandler.write_log(self.PATH_LOGFILE, 'Export all ERROR: %s' % str(del_err))
+    @timed(rows=lambda nr: max(nr, 0))
+    def export_to_file(self, path: str) -> int:
+        """
+        Stream all db values sorted by category into a json file, in the same layout as export_all.
+        Memory use does not depend on the size of the database.
+        The file is written to a temporary file first and replaced at the end, so a failed export
+        doesn't leave a half written file behind.
 
-        # commit
-        self.end_connection(con)
+        :param path: path of the json file
+        :return: number of exported entries, -1 on error
+        """
 
-        return export_data
+        path_tmp = path + '.tmp'
+        nr_entries = 0
 
+        try:
+            with open(path_tmp, 'w', encoding='utf-8') as f:
+                f.write('{')
+                current_category = None
+                for category, entry in self.iter_export_rows():
+                    # start new category list
+                    if category != current_category:
+                        f.write(('\n    ],' if current_category is not None else '')
+                                + f'\n    {json.dumps(category)}: [')
+                        current_category = category
+                        first_entry = True
+
+                    if entry is not None:
+                        f.write(('' if first_entry else ',') + '\n        ' + json.dumps(entry))
+                        first_entry = False
+                        nr_entries += 1
+
+                f.write('\n    ]\n}\n' if current_category is not None else '}\n')
+
+            os.replace(path_tmp, path)
+
+        except Exception as export_err:
+            loghandler.write_log(self.PATH_LOGFILE, 'Export to file ERROR: %s' % str(export_err), print_log=True, level=loghandler.ERROR)
+            if os.path.exists(path_tmp):
+                os.remove(path_tmp)
+            return -1
+
+        return nr_entries
+
+    @timed(rows=lambda stats: stats['rows'] if stats else 0)
     def import_all(self, data: dict):
+        """
+        Import (merge) data in the format of export_all.
+        Categories are resolved once and all entries are inserted in one transaction,
+        so either the whole file is imported or nothing. The insert triggers keep the
+        month summary and search tables up to date.
+
+        :param data: {'category': [['yyyy-mm-dd', 'name', 'category', '-1.00', rowid], ...], ...}
+        :return: dict with 'rows' imported, 'skipped' invalid entries, 'seconds' and 'rows_per_second'; None on error
+        """
 
-        # connect
-        con, cur = self.start_connection()
+        time_start = time.perf_counter()
 
         try:
-            # get all values by category
-            for category in data.keys():
-                self.add_category(category)
+            # convert entries, skip invalid ones: (category, name, cents, date)
+            # a malformed file, e.g. a list or a category without entry list, raises and is logged below
+            entries = []
+            nr_skipped = 0
+            for category, category_entries in data.items():
+                for entry in category_entries:
+                    try:
+                        if entry[2] is None or str(entry[2]) == '':
+                            raise ValueError("Entry has no category")
+
+                        entries.append((
+                            str(entry[2]),
+                            str(entry[1]),
+                            to_cents(entry[3]),
+                            datetime.date.fromisoformat(str(entry[0])[:10]).isoformat(),
+                        ))
+                    except Exception as convert_err:
+                        nr_skipped += 1
+                        loghandler.write_log(self.PATH_LOGFILE, f'IMPORT SKIPPED ENTRY {entry}: {str(convert_err)}',
+                                             level=loghandler.WARNING)
+
+            with self.transaction() as cur:
+                # add categories, incl. the ones only referenced by entries
+                # in the order of the file, so the category ids don't depend on set ordering
+                categories = dict.fromkeys([str(c) for c in data.keys()] + [e[0] for e in entries])
+                cur.executemany(
+                    "INSERT OR IGNORE INTO " + self.category_table_name + " (category) VALUES (?)",
+                    [(category,) for category in categories if category]
+                )
+                self.invalidate_category_cache()
+
+                # resolve category ids once
+                category_ids = self._get_category_cache()
+
+                cur.executemany(
+                    "INSERT INTO " + self.entry_table_name + " (category_id, name, value, date) "
+                    + "VALUES (?, ?, ?, ?)",
+                    ((category_ids[category], name, cents, date) for category, name, cents, date in entries)
+                )
+                nr_rows = cur.rowcount
+
+        except Exception as import_err:
+            # the cache may hold categories of the rolled back transaction
+            self.invalidate_category_cache()
+            loghandler.write_log(self.PATH_LOGFILE, 'Import all ERROR: %s' % str(import_err), print_log=True, level=loghandler.ERROR)
+            return None
 
+        seconds = time.perf_counter() - time_start
+        stats = {
+            'rows': nr_rows,
+            'skipped': nr_skipped,
+            'seconds': seconds,
+            'rows_per_second': nr_rows / seconds if seconds > 0 else 0.0,
+        }
+        loghandler.write_log(
+            self.PATH_LOGFILE,
+            f"Imported {stats['rows']} entries in {stats['seconds']:.3f}s "
+            f"({stats['rows_per_second']:.0f} entries/s), skipped {stats['skipped']};",
+        )
 
-                for entry in data[category]:
-                    self.add_element(entry[2], entry[1], entry[3], entry[0])
+        return stats
 
-        except Exception as del_err:
-            loghandler.write_log(self.PATH_LOGFILE, 'Export all ERROR: %s' % str(del_err))
 
-        # commit
-        self.end_connection(con)
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Database maintenance commands.")
+    parser.add_argument("command", choices=["rebuild-summary", "rebuild-search"])
+    parser.add_argument("--db", default=DataManagement.path_db, help="path to the database file")
+    args = parser.parse_args()
+
+    DataManagement.path_db = args.db
+
+    if args.command == "rebuild-summary":
+        nr_rows = DataManagement().rebuild_month_summary()
+        print(f"Rebuilt {DataManagement.summary_table_name}: {nr_rows} rows")
+    elif args.command == "rebuild-search":
+        nr_rows = DataManagement().rebuild_search_table()
+        print(f"Rebuilt {DataManagement.search_table_name}: {nr_rows} rows")
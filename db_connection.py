@@ -0,0 +1,111 @@
+"""
+This script handles the connections to the sqlite database.
+
+Connections are opened once per thread and database path and then reused,
+so a query does not have to pay for opening the database file anymore.
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionManager:
+    """Process-wide manager of long-lived sqlite connections, one per thread and database path."""
+
+    # per thread: {path_db: connection}
+    _local = threading.local()
+
+    # all connections opened by any thread, so they can be closed on shutdown
+    _lock = threading.Lock()
+    _connections = []
+    _epoch = 0  # incremented by close_all, invalidates the per thread connections
+
+    # prepared statements kept per connection, keyed by the sql text. All values are bound
+    # parameters, so the text only differs per query (and per length of IN lists);
+    # DataManagement uses about 50 distinct statements, 256 keeps all of them compiled
+    CACHED_STATEMENTS = 256
+
+    @classmethod
+    def get_connection(cls, path_db: str) -> sqlite3.Connection:
+        """
+        Get the connection of the current thread to the database at path_db.
+        The connection is opened on first use and reused afterwards.
+
+        :param path_db: path to the database file
+        :return: sqlite3 connection in autocommit mode
+        """
+
+        if getattr(cls._local, 'epoch', None) != cls._epoch:
+            cls._local.connections = {}
+            cls._local.epoch = cls._epoch
+
+        con = cls._local.connections.get(path_db)
+        if con is None:
+            con = cls._open_connection(path_db)
+            cls._local.connections[path_db] = con
+            with cls._lock:
+                cls._connections.append(con)
+
+        return con
+
+    @classmethod
+    def _open_connection(cls, path_db: str) -> sqlite3.Connection:
+        # isolation_level=None: no implicit transactions, writes use explicit transaction scopes
+        con = sqlite3.connect(
+            path_db, isolation_level=None, check_same_thread=False, cached_statements=cls.CACHED_STATEMENTS
+        )
+
+        # write ahead log: readers don't block the writer and commits don't rewrite the db file
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+
+        # enforce entry -> category references (ON DELETE CASCADE)
+        con.execute("PRAGMA foreign_keys=ON")
+
+        return con
+
+    @classmethod
+    @contextmanager
+    def transaction(cls, path_db: str):
+        """
+        Explicit write transaction scope. Commits on success, rolls back on error.
+        Nested scopes join the outer transaction.
+
+        Usage:
+            with ConnectionManager.transaction(path_db) as cur:
+                cur.execute(...)
+
+        :param path_db: path to the database file
+        :return: cursor of the connection of the current thread
+        """
+
+        con = cls.get_connection(path_db)
+        cur = con.cursor()
+
+        # join outer transaction
+        if con.in_transaction:
+            yield cur
+            return
+
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            yield cur
+        except BaseException:
+            con.rollback()
+            raise
+        else:
+            con.commit()
+
+    @classmethod
+    def close_all(cls):
+        """Close all connections of all threads, e.g. on app shutdown."""
+
+        with cls._lock:
+            for con in cls._connections:
+                try:
+                    con.close()
+                except Exception as close_err:
+                    print('ERROR: CLOSE DB CONNECTION ERROR:', close_err)
+            cls._connections = []
+            cls._epoch += 1
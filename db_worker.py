@@ -0,0 +1,119 @@
+"""
+This script runs the database calls on a background thread, so the UI never waits on sqlite.
+
+The worker thread owns its own database connection (see ConnectionManager) and runs
+the submitted calls one after another in submission order. Results are delivered back
+to the kivy main thread through the kivy Clock.
+"""
+
+import queue
+import threading
+from concurrent.futures import Future
+
+from kivy.clock import Clock
+
+import loghandler
+from data_management import DataManagement
+
+
+class DatabaseWorker:
+    """Dedicated thread with a queue of database calls."""
+
+    LOG_FILE = './logs/db_worker.log'
+
+    # shared instance, see instance()
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='DatabaseWorker', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def instance(cls):
+        """
+        Get the shared DatabaseWorker, the thread is started on first use.
+
+        :return: DatabaseWorker
+        """
+
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def submit(self, func, *args, callback=None, error_callback=None, **kwargs) -> Future:
+        """
+        Run func(*args, **kwargs) on the worker thread.
+        Calls are executed in submission order, so a read submitted after a write sees the write.
+
+        :param func: function to call on the worker thread
+        :param callback: called with the result on the kivy main thread
+        :param error_callback: called with the exception on the kivy main thread
+        :return: Future of the result
+        """
+
+        future = Future()
+        self._queue.put((future, func, args, kwargs, callback, error_callback))
+        return future
+
+    def call(self, method_name: str, *args, callback=None, error_callback=None, **kwargs) -> Future:
+        """
+        Call a method of the shared DataManagement instance on the worker thread.
+
+        Usage:
+            DatabaseWorker.instance().call('get_categories', callback=lambda categories: ...)
+
+        :param method_name: name of the DataManagement method
+        :param callback: called with the result on the kivy main thread
+        :param error_callback: called with the exception on the kivy main thread
+        :return: Future of the result
+        """
+
+        def run_method():
+            return getattr(DataManagement.instance(), method_name)(*args, **kwargs)
+
+        return self.submit(run_method, callback=callback, error_callback=error_callback)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+
+            # stop signal
+            if item is None:
+                break
+
+            future, func, args, kwargs, callback, error_callback = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                result = func(*args, **kwargs)
+
+            except Exception as worker_err:
+                loghandler.write_log(self.LOG_FILE, f"DB WORKER ERROR in {func}: {str(worker_err)}", print_log=True, level=loghandler.ERROR)
+                future.set_exception(worker_err)
+                if error_callback is not None:
+                    Clock.schedule_once(lambda dt, err=worker_err, cb=error_callback: cb(err))
+                continue
+
+            future.set_result(result)
+            if callback is not None:
+                Clock.schedule_once(lambda dt, res=result, cb=callback: cb(res))
+
+    def stop(self, timeout=5.0):
+        """Finish the queued calls and stop the worker thread."""
+
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    @classmethod
+    def shutdown(cls):
+        """Stop the shared worker if it was started, e.g. on app shutdown."""
+
+        with cls._instance_lock:
+            if cls._instance is not None:
+                cls._instance.stop()
+                cls._instance = None
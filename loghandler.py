@@ -1,29 +1,306 @@
+"""
+This script writes the log files.
 
+Every line has a level; lines below the threshold LEVEL are dropped before the message
+is formatted. Pass the values as args, or the message as callable, so debug messages
+are not built at all unless debug logging is enabled:
+
+    loghandler.debug(LOG_FILE, "Created dropdown menu; items: %s;", items)
+    loghandler.set_level(loghandler.DEBUG)  # or env BUDGET_LOG_LEVEL=DEBUG
+
+write_log only puts the line into a queue, a background thread appends the queued lines
+to their files in batches: at the latest FLUSH_INTERVAL seconds after a line was logged,
+or as soon as FLUSH_SIZE lines are queued. The queued lines are written on exit as well.
+
+A log file is rotated before a write once it is larger than ROTATE_MAX_BYTES or its first
+line is older than ROTATE_MAX_AGE: it is renamed to '<path>.<yyyymmdd-HHMMSS-ffffff>', gzip compressed
+on a separate thread and only the newest ROTATE_BACKUP_COUNT archives are kept.
+"""
+
+import atexit
 import datetime
+import glob
+import gzip
 import os
 import os.path
+import queue
+import shutil
+import threading
+import time
 
+# levels, like the logging module
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
 
-def write_log(path, log, print_log=False):
+# threshold, lines with a lower level are dropped; ERROR lines are always written
+LEVEL = {name: level for level, name in LEVEL_NAMES.items()}.get(os.environ.get('BUDGET_LOG_LEVEL', '').upper(), INFO)
 
-    # check if path exists
-    if not os.path.isfile(path):
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, 'w') as f:
-            f.write('')
+# max seconds a logged line waits in the queue
+FLUSH_INTERVAL = 1.0
+# number of queued lines which are written without waiting for FLUSH_INTERVAL
+FLUSH_SIZE = 256
 
-    try:
-        # open or create new file at path
-        f = open(path, 'a', errors='replace')
-        # append log to file
-        logmsg = str(datetime.datetime.now()) + '; ' + log + '\n'
-        f.write(logmsg)
-        # close
-        f.close()
-
-    except Exception as log_write_err:
-        print('LOG WRITE ERROR: ' + str(log_write_err))
-        raise Exception('LOG WRITE ERROR: ' + str(log_write_err))
+# rotation per log file
+ROTATE_MAX_BYTES = 1024 * 1024
+ROTATE_MAX_AGE = datetime.timedelta(days=30)
+ROTATE_BACKUP_COUNT = 5
+
+_queue = queue.SimpleQueue()
+_writer = None
+_writer_lock = threading.Lock()
+
+# rotated files waiting for compression, see _run_compressor
+_compress_queue = queue.SimpleQueue()
+_compressor = None
+
+# time of the first line per log file, read once per path; see _needs_rotation
+_file_started = {}
+
+# queue items besides (path, line): stop the writer, or an event which is set once everything before it is written
+_STOP = object()
+
+
+def set_level(level: int):
+    """ Set the threshold, e.g. set_level(loghandler.DEBUG) """
+
+    global LEVEL
+    LEVEL = level
+
+
+def is_enabled_for(level: int) -> bool:
+    return level >= LEVEL or level >= ERROR
+
+
+def write_log(path, log, print_log=False, level=INFO, args=()):
+    """
+    Log a line to the file at path.
+
+    :param path: path to the log file
+    :param log: message; or callable returning the message, only called if the level is enabled
+    :param print_log: print the line as well
+    :param level: DEBUG, INFO, WARNING or ERROR
+    :param args: values for the %-placeholders of the message, only formatted if the level is enabled
+    """
+
+    if level < LEVEL and level < ERROR:
+        return
+
+    if callable(log):
+        log = log()
+    if args:
+        log = log % tuple(args)
+
+    logmsg = str(datetime.datetime.now()) + '; ' + LEVEL_NAMES.get(level, str(level)) + '; ' + log + '\n'
+
+    # append the line to the file on the writer thread
+    _ensure_writer()
+    _queue.put((path, logmsg))
 
     if print_log:
         print(logmsg)
+
+
+def debug(path, log, *args):
+    write_log(path, log, level=DEBUG, args=args)
+
+
+def info(path, log, *args):
+    write_log(path, log, level=INFO, args=args)
+
+
+def warning(path, log, *args):
+    write_log(path, log, level=WARNING, args=args)
+
+
+def error(path, log, *args):
+    write_log(path, log, print_log=True, level=ERROR, args=args)
+
+
+def flush(timeout=5.0):
+    """ Block until all lines logged before this call are written """
+
+    if _writer is None:
+        return
+
+    written = threading.Event()
+    _queue.put(written)
+    written.wait(timeout)
+
+
+def shutdown(timeout=5.0):
+    """ Write the queued lines and stop the writer thread, e.g. on exit """
+
+    global _writer
+
+    with _writer_lock:
+        if _writer is None:
+            return
+        _queue.put(_STOP)
+        _writer.join(timeout)
+        _writer = None
+
+    # finish the compression of rotated files
+    if _compressor is not None:
+        _compress_queue.put(_STOP)
+        _compressor.join(timeout)
+
+
+def _ensure_writer():
+    global _writer
+
+    if _writer is not None:
+        return
+
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_run_writer, name='LogWriter', daemon=True)
+            _writer.start()
+
+
+def _run_writer():
+    # {path: [lines]}, in the order they were logged
+    buffers = {}
+    nr_buffered = 0
+    deadline = None
+
+    while True:
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            item = _queue.get(timeout=timeout)
+        except queue.Empty:
+            item = None
+
+        stop = item is _STOP
+        if isinstance(item, tuple):
+            path, line = item
+            buffers.setdefault(path, []).append(line)
+            nr_buffered += 1
+            if deadline is None:
+                deadline = time.monotonic() + FLUSH_INTERVAL
+
+        # write on timeout, size threshold, flush() and stop
+        if item is None or stop or isinstance(item, threading.Event) or nr_buffered >= FLUSH_SIZE:
+            _write_buffers(buffers)
+            buffers = {}
+            nr_buffered = 0
+            deadline = None
+
+        if isinstance(item, threading.Event):
+            item.set()
+        if stop:
+            return
+
+
+def _write_buffers(buffers: dict):
+    for path, lines in buffers.items():
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            if _needs_rotation(path):
+                _rotate(path)
+
+            # open or create new file at path and append the lines
+            with open(path, 'a', errors='replace') as f:
+                f.writelines(lines)
+
+            if path not in _file_started:
+                _file_started[path] = datetime.datetime.now()
+
+        except Exception as log_write_err:
+            print('LOG WRITE ERROR: ' + str(log_write_err))
+
+
+
+# region rotation
+def _needs_rotation(path: str) -> bool:
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return False  # no file yet
+
+    if size >= ROTATE_MAX_BYTES:
+        return True
+
+    # age of the file: time of its first line, read once per path
+    started = _file_started.get(path)
+    if started is None:
+        try:
+            with open(path, 'r', errors='replace') as f:
+                started = datetime.datetime.fromisoformat(f.readline().split(';', 1)[0])
+        except (ValueError, OSError):
+            started = datetime.datetime.now()  # no timestamp, count the age from now on
+        _file_started[path] = started
+
+    return datetime.datetime.now() - started >= ROTATE_MAX_AGE
+
+
+def _rotate(path: str):
+    """ Rename the log file to an archive name and queue it for compression; the rename is cheap """
+
+    rotated_path = f"{path}.{datetime.datetime.now():%Y%m%d-%H%M%S-%f}"
+    os.replace(path, rotated_path)
+    _file_started.pop(path, None)
+
+    _ensure_compressor()
+    _compress_queue.put((path, rotated_path))
+
+
+def _ensure_compressor():
+    global _compressor
+
+    if _compressor is not None and _compressor.is_alive():
+        return
+
+    _compressor = threading.Thread(target=_run_compressor, name='LogCompressor', daemon=True)
+    _compressor.start()
+
+
+def _run_compressor():
+    while True:
+        item = _compress_queue.get()
+        if item is _STOP:
+            return
+
+        path, rotated_path = item
+
+        # incl. rotated files which weren't compressed before the app was killed
+        leftovers = [p for p in glob.glob(glob.escape(path) + '.*') if not p.endswith(('.gz', '.tmp'))]
+        for uncompressed_path in sorted(set([rotated_path] + leftovers)):
+            try:
+                _compress(uncompressed_path)
+            except FileNotFoundError:
+                pass  # compressed as leftover already
+            except Exception as log_compress_err:
+                print('LOG COMPRESS ERROR: ' + str(log_compress_err))
+
+        try:
+            _remove_old_archives(path)
+        except Exception as log_remove_err:
+            print('LOG REMOVE ARCHIVE ERROR: ' + str(log_remove_err))
+
+
+def _compress(uncompressed_path: str):
+    # compress to a temp file first, so a killed app never leaves a truncated archive
+    with open(uncompressed_path, 'rb') as f_in, gzip.open(uncompressed_path + '.gz.tmp', 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.replace(uncompressed_path + '.gz.tmp', uncompressed_path + '.gz')
+    os.remove(uncompressed_path)
+
+
+def _remove_old_archives(path: str):
+    """ Keep the newest ROTATE_BACKUP_COUNT archives of the log file """
+
+    # archive names sort by their rotation time
+    archives = sorted(glob.glob(glob.escape(path) + '.*.gz'))
+    for archive in archives[:-ROTATE_BACKUP_COUNT] if ROTATE_BACKUP_COUNT > 0 else archives:
+        os.remove(archive)
+# endregion
+
+
+# write the queued lines on exit
+atexit.register(shutdown)
@@ -21,6 +21,10 @@ from kivymd.uix.toolbar import MDTopAppBar
 
 from screens import settings, db_settings
 from save_system import SaveSystem
+from db_connection import ConnectionManager
+from db_worker import DatabaseWorker
+from query_stats import QueryStats
+import loghandler
 
 # set file variables
 KIVY_FILE_SCREEN_MANAGER = "./templates/screen_manager.kv"
@@ -44,18 +48,41 @@ class BudgetManagerApp(MDApp):
     def build(self):
 
         # load dark mode settings and apply
-        dark_mode = SaveSystem().load_variable(
-            SaveSystem().SAVE_FILE_SETTINGS, "dark_mode"
+        dark_mode = SaveSystem.load_variable(
+            SaveSystem.SAVE_FILE_SETTINGS, "dark_mode"
         )
         dark_mode = dark_mode if dark_mode is not None else True  # dart mode default
         settings.SettingsView().on_dark_theme_switch(dark_mode, self.theme_cls)
 
+        # opt-in timing stats of the database calls, see the hidden debug panel in the settings
+        settings.SettingsView.apply_query_stats_setting(settings.SettingsView.get_query_stats_value())
+
         # print("dark mode", dark_mode)
 
         # load kivy file(s)
         self.manager = Builder.load_file(KIVY_FILE_SCREEN_MANAGER)
         return self.manager
 
+    def on_pause(self):
+        # the app may be killed while paused, write the pending settings and log lines
+        SaveSystem.flush()
+        loghandler.flush()
+        return True
+
+    def on_stop(self):
+        # write the pending settings
+        SaveSystem.flush()
+
+        # finish queued database calls, then close the long-lived database connections
+        if QueryStats.enabled:
+            QueryStats.dump_to_log()
+        QueryStats.disable()
+        DatabaseWorker.shutdown()
+        ConnectionManager.close_all()
+
+        # write the queued log lines
+        loghandler.shutdown()
+
 
 class BMTopAppBar(MDTopAppBar):
     """ Custom Top Tool Bar """
@@ -67,6 +94,7 @@ class BMTopAppBar(MDTopAppBar):
     settings_screen_name = "settings_view"
     db_settings_screen_name = "dbsettings_view"
     entry_add_screen_name = "entry_add_view"
+    search_screen_name = "search_view"
 
     # button icons
     settings_icon = "dots-vertical"
@@ -117,6 +145,14 @@ class BMTopAppBar(MDTopAppBar):
             self.settings_dropdown_menu = MDDropdownMenu(
                 caller=self.settings_dropdown_menu_caller,
                 items=[
+                    {
+                        "text": "Search",
+                        "viewclass": "OneLineListItem",
+                        "height": dp(54),
+                        "on_release": lambda: self.on_settings_dropdown_menu(
+                            self.search_screen_name
+                        ),
+                    },
                     {
                         "text": "Settings",
                         "viewclass": "OneLineListItem",
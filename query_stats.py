@@ -0,0 +1,201 @@
+"""
+This script records timing statistics of the database calls, to find slow screen actions.
+
+The instrumentation is opt-in: as long as it is disabled, a timed call costs one attribute check.
+
+Usage:
+    QueryStats.enable(log_interval=60)    # start recording, dump to the log every minute
+    QueryStats.stats()                    # {'get_entries_page': {'calls': 12, 'p50': ..., ...}, ...}
+"""
+
+import functools
+import math
+import threading
+import time
+from collections import deque
+
+import loghandler
+
+
+class QueryStats:
+    """Process-wide call count, latency percentiles and returned rows per database method."""
+
+    LOG_FILE = './logs/query_stats.log'
+
+    # latency percentiles are computed over the most recent calls per method
+    SAMPLE_SIZE = 1024
+
+    enabled = False
+
+    # {name: {'calls': int, 'total': float seconds, 'rows': int, 'samples': deque of seconds}}
+    _methods = {}
+    _lock = threading.Lock()
+
+    # periodic log dump
+    _log_interval = None
+    _log_timer = None
+
+    @classmethod
+    def enable(cls, log_interval: float = None):
+        """
+        Start recording.
+
+        :param log_interval: seconds between dumps of the stats to LOG_FILE, None for no dumps
+        """
+
+        cls.enabled = True
+        cls._log_interval = log_interval
+        cls._schedule_log_dump()
+
+    @classmethod
+    def disable(cls):
+        """ Stop recording and the log dumps, the recorded stats are kept """
+
+        cls.enabled = False
+        cls._log_interval = None
+        if cls._log_timer is not None:
+            cls._log_timer.cancel()
+            cls._log_timer = None
+
+    @classmethod
+    def reset(cls):
+        """ Drop the recorded stats """
+
+        with cls._lock:
+            cls._methods = {}
+
+    @classmethod
+    def record(cls, name: str, seconds: float, rows: int = None):
+        """
+        Record one call.
+
+        :param name: name of the method
+        :param seconds: duration of the call
+        :param rows: number of returned rows, None if the method doesn't return rows
+        """
+
+        with cls._lock:
+            method = cls._methods.get(name)
+            if method is None:
+                method = cls._methods[name] = {
+                    'calls': 0, 'total': 0.0, 'rows': 0, 'samples': deque(maxlen=cls.SAMPLE_SIZE)
+                }
+            method['calls'] += 1
+            method['total'] += seconds
+            method['rows'] += rows or 0
+            method['samples'].append(seconds)
+
+    @staticmethod
+    def _percentile(sorted_samples: list, percentile: float) -> float:
+        # nearest rank
+        rank = math.ceil(percentile / 100 * len(sorted_samples))
+        return sorted_samples[max(rank, 1) - 1]
+
+    @classmethod
+    def stats(cls) -> dict:
+        """
+        Recorded stats per method, slowest total first.
+
+        :return: {'method': {'calls': int, 'total': seconds, 'p50': seconds, 'p99': seconds, 'rows': int}}
+        """
+
+        with cls._lock:
+            methods = {name: (m['calls'], m['total'], m['rows'], sorted(m['samples'])) for name, m in cls._methods.items()}
+
+        stats = {
+            name: {
+                'calls': calls,
+                'total': total,
+                'p50': cls._percentile(samples, 50),
+                'p99': cls._percentile(samples, 99),
+                'rows': rows,
+            }
+            for name, (calls, total, rows, samples) in methods.items()
+        }
+        return dict(sorted(stats.items(), key=lambda item: item[1]['total'], reverse=True))
+
+    @classmethod
+    def format_stats(cls) -> str:
+        """ Recorded stats as text table, one line per method """
+
+        lines = [f"{'method':<28}{'calls':>7}{'total ms':>10}{'p50 ms':>9}{'p99 ms':>9}{'rows':>9}"]
+        for name, s in cls.stats().items():
+            lines.append(
+                f"{name[:28]:<28}{s['calls']:>7}{s['total'] * 1000:>10.1f}"
+                f"{s['p50'] * 1000:>9.2f}{s['p99'] * 1000:>9.2f}{s['rows']:>9}"
+            )
+        return "\n".join(lines)
+
+    @classmethod
+    def dump_to_log(cls):
+        """ Write the recorded stats to LOG_FILE """
+
+        loghandler.write_log(cls.LOG_FILE, "QUERY STATS:\n" + cls.format_stats())
+
+    @classmethod
+    def _schedule_log_dump(cls):
+        if cls._log_timer is not None:
+            cls._log_timer.cancel()
+            cls._log_timer = None
+
+        if not cls.enabled or not cls._log_interval:
+            return
+
+        cls._log_timer = threading.Timer(cls._log_interval, cls._on_log_timer)
+        cls._log_timer.daemon = True
+        cls._log_timer.start()
+
+    @classmethod
+    def _on_log_timer(cls):
+        try:
+            cls.dump_to_log()
+        except Exception as dump_err:
+            print('ERROR: QUERY STATS LOG DUMP ERROR:', dump_err)
+        cls._schedule_log_dump()
+
+
+def count_rows(result):
+    """ Default row count of a result: its length, None if it has none """
+
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def no_rows(result):
+    """ Row count of methods which don't return rows, e.g. a total """
+    return None
+
+
+def timed(func=None, *, rows=count_rows):
+    """
+    Decorator, records the calls of func in QueryStats while it is enabled.
+
+    Usage:
+        @timed
+        def get_available_dates(self): ...
+
+        @timed(rows=lambda page: len(page[0]))
+        def get_entries_page(self, date_yyyymm, after=None, limit=None): ...
+
+    :param func: decorated function
+    :param rows: function result -> number of rows
+    """
+
+    if func is None:
+        return functools.partial(timed, rows=rows)
+
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not QueryStats.enabled:
+            return func(*args, **kwargs)
+
+        time_start = time.perf_counter()
+        result = func(*args, **kwargs)
+        QueryStats.record(name, time.perf_counter() - time_start, rows(result))
+        return result
+
+    return wrapper
@@ -1,9 +1,20 @@
 """
 This script handles the saving of variables to reuse them.
+
+Save files are read once per process and kept in memory. Saved variables change the
+in-memory data right away and are written to the file shortly after (write-behind),
+so several saves in a row cost one write. save_many and batch apply several variables
+at once, so a write never contains only a part of them. Files are written atomically:
+to a temp file which then replaces the save file, so a killed app leaves either the old
+or the new file.
 """
 
+import atexit
+import copy
+from contextlib import contextmanager
 import os
 import json
+import threading
 
 
 class SaveSystem:
@@ -12,10 +23,24 @@ class SaveSystem:
     SAVE_FOLDER = './saves/'
     SAVE_FILE_SETTINGS = os.path.join(SAVE_FOLDER, 'settings.json')
 
+    # seconds between a save and the write of the file
+    FLUSH_DELAY = 0.5
+
+    # {file_path: data}, loaded once per file
+    _cache = {}
+    # files with saved changes which are not written yet
+    _dirty = set()
+    _lock = threading.RLock()
+    _flush_lock = threading.Lock()
+    _flush_timer = None
+
+    _files_checked = False
 
     def __init__(self):
-        # make sure files exist
-        self.check_files_exists()
+        # make sure files exist, once per process
+        if not SaveSystem._files_checked:
+            self.check_files_exists()
+            SaveSystem._files_checked = True
 
 
     def check_files_exists(self):
@@ -33,10 +58,38 @@ class SaveSystem:
                 f.close()
             print('created file: {0}'.format(self.SAVE_FILE_SETTINGS))
 
-    @staticmethod
-    def save_variable(file_path: str, variable_key: str, variable_value):
+    @classmethod
+    def _get_data(cls, file_path: str):
+        """
+        Cached content of a save file, read on first use.
+        A missing file is empty; returns None if the file can't be read.
+        """
+
+        with cls._lock:
+            data = cls._cache.get(file_path)
+            if data is not None:
+                return data
+
+            try:
+                if os.path.exists(file_path):
+                    # read file and save content in data variable
+                    with open(file_path, 'r', errors='replace') as f:
+                        data = json.load(f)
+                else:
+                    data = {}
+
+            except Exception as save_read_err:
+                print('ERROR: SAVE FILE READ ERROR:', save_read_err)
+                return None
+
+            cls._cache[file_path] = data
+            return data
+
+    @classmethod
+    def save_variable(cls, file_path: str, variable_key: str, variable_value):
         """
-        Save a variable
+        Save a variable.
+        The file is written in the background after FLUSH_DELAY seconds, see flush.
 
         :param file_path: path to save file
         :param variable_key: key of the variable
@@ -44,54 +97,143 @@ class SaveSystem:
         :return
         """
 
+        # a value which can't be written to the file is not saved at all
         try:
-            # read file and save content in data variable
-            f = open(file_path, 'r', errors='replace')
-            data = json.load(f)
-            f.close()
-
-            # print(f"read data from file '{file_path}': {data}")
-
-        except Exception as save_read_err:
-            print('ERROR: SAVE FILE READ ERROR:', save_read_err)
+            json.dumps(variable_value)
+        except (TypeError, ValueError) as save_value_err:
+            print('ERROR: SAVE VARIABLE ERROR:', variable_key, save_value_err)
             return
 
-        try:
+        with cls._lock:
+            data = cls._get_data(file_path)
+            if data is None:
+                return
+
             # save or overwrite save variable
-            data[variable_key] = variable_value
+            data[variable_key] = copy.deepcopy(variable_value)
+            cls._dirty.add(file_path)
+            cls._schedule_flush()
 
-            # save to file
-            f = open(file_path, 'w', errors='replace')
-            json.dump(data, f, indent=4)
-            f.close()
+    @classmethod
+    def save_many(cls, file_path: str, variables: dict, flush: bool = False):
+        """
+        Save several variables at once: the file is written with all of them or none of them.
+        If one of the values can't be written to the file, none of them is saved.
 
-        except Exception as save_write_err:
-            print('ERROR: SAVE FILE WRITE ERROR:', save_write_err)
+        :param file_path: path to save file
+        :param variables: {variable_key: variable_value}
+        :param flush: write the file now instead of in the background
+        :return
+        """
+
+        # check and copy first, so a value which can't be written doesn't leave a part of the variables saved
+        try:
+            json.dumps(variables)
+            variables = copy.deepcopy(dict(variables))
+        except (TypeError, ValueError, copy.Error) as save_value_err:
+            print('ERROR: SAVE VARIABLES ERROR:', list(variables), save_value_err)
             return
 
-    @staticmethod
-    def load_variable(file_path: str, variable_key: str):
+        with cls._lock:
+            data = cls._get_data(file_path)
+            if data is None:
+                return
+
+            data.update(variables)
+            cls._dirty.add(file_path)
+            cls._schedule_flush()
+
+        if flush:
+            cls.flush()
+
+    @classmethod
+    @contextmanager
+    def batch(cls, file_path: str, flush: bool = False):
+        """
+        Collect variables and save them at once with save_many when the block ends.
+        If the block raises an error, none of them is saved.
+
+        Usage:
+            with SaveSystem.batch(SaveSystem.SAVE_FILE_SETTINGS) as settings:
+                settings['dark_mode'] = True
+                settings['query_stats'] = False
+
+        :param file_path: path to save file
+        :param flush: write the file now instead of in the background
+        :return: dict to put the variables in
+        """
+
+        variables = {}
+        yield variables
+        cls.save_many(file_path, variables, flush=flush)
+
+    @classmethod
+    def load_variable(cls, file_path: str, variable_key: str):
         """
         Load a variable from save file.
         If variable_key is not in save_file, return None.
         """
 
-        try:
-            # read file and save content in data variable
-            f = open(file_path, 'r', errors='replace')
-            data = json.load(f)
-            f.close()
+        with cls._lock:
+            data = cls._get_data(file_path)
+            if data is None or variable_key not in data:
+                return None
+            return copy.deepcopy(data[variable_key])
+
+    @classmethod
+    def _schedule_flush(cls):
+        # one pending write collects all saves until it runs
+        if cls._flush_timer is None:
+            cls._flush_timer = threading.Timer(cls.FLUSH_DELAY, cls.flush)
+            cls._flush_timer.daemon = True
+            cls._flush_timer.start()
+
+    @classmethod
+    def flush(cls):
+        """ Write the saved changes to the files now, e.g. when the app is paused or stopped """
+
+        with cls._flush_lock:
+            with cls._lock:
+                if cls._flush_timer is not None:
+                    cls._flush_timer.cancel()
+                    cls._flush_timer = None
+
+                # serialize under the lock, write outside of it
+                files = {}
+                for file_path in cls._dirty:
+                    try:
+                        files[file_path] = json.dumps(cls._cache[file_path], indent=4)
+                    except Exception as save_serialize_err:
+                        # can't be written, the other files are written anyway
+                        print('ERROR: SAVE FILE SERIALIZE ERROR:', file_path, save_serialize_err)
+                cls._dirty.clear()
+
+            for file_path, content in files.items():
+                try:
+                    cls._write_atomic(file_path, content)
+
+                except Exception as save_write_err:
+                    print('ERROR: SAVE FILE WRITE ERROR:', save_write_err)
+                    # try again with the next flush
+                    with cls._lock:
+                        cls._dirty.add(file_path)
+
+    @staticmethod
+    def _write_atomic(file_path: str, content: str):
+        folder = os.path.dirname(file_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
 
-            # print(f"read data from file '{file_path}': {data}")
+        tmp_path = file_path + '.tmp'
+        with open(tmp_path, 'w', errors='replace') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
 
-        except Exception as save_read_err:
-            print('ERROR: SAVE FILE READ ERROR:', save_read_err)
-            return None
 
-        if variable_key in data:
-            return data[variable_key]
-        else:
-            return None
+# write the saved changes on exit
+atexit.register(SaveSystem.flush)
 
 
 # SaveSystem().save_variable(SAVE_FILE_SETTINGS, 'dark_mode', True)
@@ -19,6 +19,7 @@ from kivy.utils import platform
 
 from save_system import SaveSystem
 from data_management import DataManagement
+from db_worker import DatabaseWorker
 from assets.utilities.permission_manager import PermissionManager
 import loghandler
 
@@ -213,16 +214,17 @@ class DBSettingsView(MDScreen):
             self.category_create_dialog_on_close()
             return
 
-        # add new category
-        DataManagement().add_category(category_name)
+        def on_category_added(_):
+            # create a quick snackbar as feedback that category was created
+            Snackbar(text=f'Created new category: "{category_name}".',
+                     snackbar_x='20dp',
+                     snackbar_y='20dp',
+                     size_hint_x=(Window.width - (dp(20) * 2)) / Window.width,
+                     duration=3,
+                     ).open()
 
-        # create a quick snackbar as feedback that category was created
-        Snackbar(text=f'Created new category: "{category_name}".',
-                 snackbar_x='20dp',
-                 snackbar_y='20dp',
-                 size_hint_x=(Window.width - (dp(20) * 2)) / Window.width,
-                 duration=3,
-                 ).open()
+        # add new category
+        DatabaseWorker.instance().call("add_category", category_name, callback=on_category_added)
 
         # close dialog
         self.category_create_dialog_on_close()
@@ -238,14 +240,15 @@ class DBSettingsView(MDScreen):
         if not self.category_delete_dialog:
             self.init_category_management_dialogs()
 
-        [print(category_name) for category_name in DataManagement().get_categories()]
+        def on_categories(categories: list):
+            # set dialog items; list all categories
+            self.category_delete_dialog.update_items([
+                DeleteCategoryDialogItem(text=f"{category_name}") for category_name in categories
+            ])
 
-        # set dialog items; list all categories
-        self.category_delete_dialog.update_items([
-            DeleteCategoryDialogItem(text=f"{category_name}") for category_name in DataManagement().get_categories()
-        ])
+            self.category_delete_dialog.open()
 
-        self.category_delete_dialog.open()
+        DatabaseWorker.instance().call("get_categories", callback=on_categories)
 
     def category_delete_dialog_on_close(self):
         """ Close and reset category delete dialog"""
@@ -266,9 +269,20 @@ class DBSettingsView(MDScreen):
             return
 
         # get number of items to delete
-        nr_of_entries_to_delete = 0
-        for item in items_to_delete:
-            nr_of_entries_to_delete += len(DataManagement().get_entries_by_category(item))
+        DatabaseWorker.instance().call(
+            "count_entries_by_category",
+            items_to_delete,
+            callback=lambda counts: self.category_delete_dialog_open_alert(items_to_delete, counts),
+        )
+
+    def category_delete_dialog_open_alert(self, items_to_delete: list, counts: dict):
+        """ open the alert dialog to confirm deletion of category
+
+        :param items_to_delete: list of category names
+        :param counts: dict {'category': (count, total)}, as returned by DataManagement.count_entries_by_category
+        """
+
+        nr_of_entries_to_delete = sum(count for count, _ in counts.values())
 
         # create alert title and text
         alert_title, alert_text = "Delete Category?", f"Delete category: '{items_to_delete[0]}',\nand {nr_of_entries_to_delete} related entries?"
@@ -311,17 +325,29 @@ class DBSettingsView(MDScreen):
             return
 
         # make deletion on database
-        for item in items_to_delete:
-            DataManagement().del_category(item)
-        loghandler.write_log(self.LOG_FILE, f"Deleted categories: {items_to_delete};")
+        DatabaseWorker.instance().call(
+            "del_categories",
+            items_to_delete,
+            callback=lambda nr_deleted: self.category_delete_alert_dialog_on_deleted(items_to_delete, *nr_deleted),
+        )
+
+        # close dialog
+        self.category_delete_alert_dialog_on_close()
+
+    def category_delete_alert_dialog_on_deleted(self, items_to_delete: list, nr_categories: int, nr_entries: int):
+        """ feedback after the deletion was submitted to the database """
+
+        loghandler.write_log(self.LOG_FILE, f"Deleted categories: {items_to_delete}; "
+                                            f"{nr_categories} categories, {nr_entries} entries;")
 
         # create snackbar text
-        alert_text = f"Deleted category: '{items_to_delete[0]}'."
+        alert_text = f"Deleted category: '{items_to_delete[0]}'"
         # change alert title and text if there are mor than one category to delete
         if len(items_to_delete) > 1:
             alert_text = f"Deleted categories: "
             for i in range(len(items_to_delete)):
                 alert_text += f"'{items_to_delete[i]}'" + (", " if i <= len(items_to_delete) - 2 else "")
+        alert_text += f" and {nr_entries} entries." if nr_entries >= 0 else "."
 
         # create a quick snackbar as feedback that category/ies was deleted
         Snackbar(text=alert_text,
@@ -330,9 +356,6 @@ class DBSettingsView(MDScreen):
                  size_hint_x=(Window.width - (dp(20) * 2)) / Window.width,
                  duration=3,
                  ).open()
-
-        # close dialog
-        self.category_delete_alert_dialog_on_close()
     # endregion
 
     # region delete_month
@@ -345,14 +368,15 @@ class DBSettingsView(MDScreen):
         if not self.month_delete_dialog:
             self.init_category_management_dialogs()
 
-        [print(category_name) for category_name in DataManagement().get_categories()]
+        def on_available_dates(available_dates: list):
+            # set dialog items; list all months
+            self.month_delete_dialog.update_items([
+                DeleteCategoryDialogItem(text=f"{month_name}") for month_name in available_dates
+            ])
 
-        # set dialog items; list all categories
-        self.month_delete_dialog.update_items([
-            DeleteCategoryDialogItem(text=f"{month_name}") for month_name in DataManagement().get_available_dates()
-        ])
+            self.month_delete_dialog.open()
 
-        self.month_delete_dialog.open()
+        DatabaseWorker.instance().call("get_available_dates", callback=on_available_dates)
 
     def month_delete_dialog_on_close(self):
         """ Close and reset month delete dialog"""
@@ -371,9 +395,20 @@ class DBSettingsView(MDScreen):
             return
 
         # get number of items to delete
-        nr_of_entries_to_delete = 0
-        for item in items_to_delete:
-            nr_of_entries_to_delete += len(DataManagement().get_entries_by_date(item))
+        DatabaseWorker.instance().call(
+            "count_entries_by_month",
+            items_to_delete,
+            callback=lambda counts: self.month_delete_dialog_open_alert(items_to_delete, counts),
+        )
+
+    def month_delete_dialog_open_alert(self, items_to_delete: list, counts: dict):
+        """ open the alert dialog to confirm deletion of month
+
+        :param items_to_delete: list of months
+        :param counts: dict {'yyyy-mm': (count, total)}, as returned by DataManagement.count_entries_by_month
+        """
+
+        nr_of_entries_to_delete = sum(count for count, _ in counts.values())
 
         # create alert title and text
         alert_title, alert_text = "Delete Month?", f"Delete month: '{items_to_delete[0]}',\nand {nr_of_entries_to_delete} related entries?"
@@ -418,17 +453,28 @@ class DBSettingsView(MDScreen):
             return
 
         # make deletion on database
-        for item in items_to_delete:
-            DataManagement().del_month(item)
-        loghandler.write_log(self.LOG_FILE, f"Deleted months: {items_to_delete};")
+        DatabaseWorker.instance().call(
+            "del_months",
+            items_to_delete,
+            callback=lambda nr_entries: self.month_delete_alert_dialog_on_deleted(items_to_delete, nr_entries),
+        )
+
+        # close dialog
+        self.month_delete_alert_dialog_on_close()
+
+    def month_delete_alert_dialog_on_deleted(self, items_to_delete: list, nr_entries: int):
+        """ feedback after the deletion was submitted to the database """
+
+        loghandler.write_log(self.LOG_FILE, f"Deleted months: {items_to_delete}; {nr_entries} entries;")
 
         # create snackbar text
-        alert_text = f"Deleted month: '{items_to_delete[0]}'."
+        alert_text = f"Deleted month: '{items_to_delete[0]}'"
         # change alert title and text if there are mor than one category to delete
         if len(items_to_delete) > 1:
             alert_text = f"Deleted months: "
             for i in range(len(items_to_delete)):
                 alert_text += f"'{items_to_delete[i]}'" + (", " if i <= len(items_to_delete) - 2 else "")
+        alert_text += f" with {nr_entries} entries." if nr_entries >= 0 else "."
 
         # create a quick snackbar as feedback that category/ies was deleted
         Snackbar(text=alert_text,
@@ -437,9 +483,6 @@ class DBSettingsView(MDScreen):
                  size_hint_x=(Window.width - (dp(20) * 2)) / Window.width,
                  duration=3,
                  ).open()
-
-        # close dialog
-        self.month_delete_alert_dialog_on_close()
     # endregion
 
     # region export_import_db
@@ -477,31 +520,39 @@ class DBSettingsView(MDScreen):
         """
 
         # print(path, toast(path))
-        path = self.export_db_data(path)
+        # export on the database thread, the file is written there as well
+        DatabaseWorker.instance().submit(
+            self.export_db_data,
+            path,
+            callback=lambda export_path: toast(f"Exported to '{export_path}'"),
+            error_callback=lambda err: toast('Error on export'),
+        )
 
         self.export_exit_manager()
-        toast(f"Exported to '{path}'")
 
-    def export_db_data(self, path: str):
-        """ Export the db data into a json file """
+    def export_db_data(self, path: str) -> str:
+        """ Export the db data into a json file
 
-        # todo error handling
+        :param path: path to the selected directory or file;
+        :return: path to the exported file
+        :raises OSError: if the export failed
+        """
 
         # make sure it's a folder not a file
         if not os.path.isdir(path):
             path = os.path.dirname(path)
-            self.export_db_data(path)
-            return path
-
-        # get data
-        data = DataManagement().export_all()
 
         # add file name
         path = os.path.join(path, 'db.json')
 
-        # dump data to file
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, fp=f, indent=4)
+        # stream data to file
+        nr_entries = DataManagement.instance().export_to_file(path)
+        if nr_entries < 0:
+            loghandler.write_log(self.LOG_FILE, f"EXPORT ERROR: Could not export to '{path}', check the database log;", level=loghandler.ERROR)
+            # shows the export error, see export_select_path
+            raise OSError(f"Could not export to '{path}'")
+
+        loghandler.write_log(self.LOG_FILE, f"Exported {nr_entries} entries to '{path}';")
 
         return path
 
@@ -527,20 +578,22 @@ class DBSettingsView(MDScreen):
         """
 
         # print(path, toast(path))
-        success = self.import_db_data(path)
+        # import on the database thread, reading and parsing the file happens there as well
+        DatabaseWorker.instance().submit(
+            self.import_db_data,
+            path,
+            callback=lambda success: toast('Imported data' if success else 'Error on import'),
+            error_callback=lambda err: toast('Error on import'),
+        )
 
         self.import_exit_manager()
-        if not success:
-            toast('Error on import')
-        else:
-            toast('Imported data')
 
     def import_db_data(self, path: str) -> bool:
         """ Export the db data into a json file """
 
         # make sure it's a folder not a file
         if not os.path.isfile(path):
-            loghandler.write_log(self.LOG_FILE, f"IMPORT ERROR: NO FILE SELECTED: '{path}';")
+            loghandler.write_log(self.LOG_FILE, f"IMPORT ERROR: NO FILE SELECTED: '{path}';", level=loghandler.ERROR)
             return False
 
         # get data
@@ -550,17 +603,23 @@ class DBSettingsView(MDScreen):
                 data = json.load(fp=f)
         except Exception as read_dict_err:
             err_msg = f"IMPORT JSON READ FILE ERROR: {str(read_dict_err)}"
-            loghandler.write_log(self.LOG_FILE, err_msg, print_log=True)
+            loghandler.write_log(self.LOG_FILE, err_msg, print_log=True, level=loghandler.ERROR)
             return False
 
         # import data
         if data:
-            DataManagement().import_all(data)
+            import_stats = DataManagement.instance().import_all(data)
         else:
-            loghandler.write_log(self.LOG_FILE, f"IMPORT ERROR: Read file error, either no content or ")
+            loghandler.write_log(self.LOG_FILE, f"IMPORT ERROR: Read file error, either no content or ", level=loghandler.ERROR)
+            return False
+
+        if import_stats is None:
+            loghandler.write_log(self.LOG_FILE, f"IMPORT ERROR: Database import failed, see database log;", level=loghandler.ERROR)
             return False
 
-        loghandler.write_log(self.LOG_FILE, f"IMPORTED DATA from file: '{path}'", print_log=True)
+        loghandler.write_log(self.LOG_FILE, f"IMPORTED DATA from file: '{path}'; "
+                                            f"{import_stats['rows']} entries, "
+                                            f"{import_stats['rows_per_second']:.0f} entries/s;", print_log=True)
         return True
 
     def import_exit_manager(self, *args):
@@ -21,9 +21,9 @@ from datetime import date
 import calendar
 
 # import scripts
-import data_management
 import loghandler
 from assets.date_selector.date_selector import DateSelector
+from db_worker import DatabaseWorker
 
 # path to log file from main.pys view
 LOG_FILE_ENTRY_VIEW = "./logs/entry_add_view.log"
@@ -90,6 +90,15 @@ class EntryAddView(MDScreen):
         if not self.menu_select_category:
             self.init_category_select_dropdown()
 
+        DatabaseWorker.instance().call("get_categories", callback=self.update_menu_select_category)
+
+    def update_menu_select_category(self, categories: list):
+        """ Set the items of the category dropdown menu, and the default category if none is selected.
+
+        :param categories: list of category names
+        :return:
+        """
+
         # define dropdown menu items
         items = [
             {
@@ -97,17 +106,19 @@ class EntryAddView(MDScreen):
                 "viewclass": "OneLineListItem",
                 "height": dp(54),
                 "on_release": lambda x=category: self.on_menu_select_category(str(x)),
-            } for category in data_management.DataManagement().get_categories()
+            } for category in categories
         ]
 
         # add caller and items
         self.menu_select_category.caller = self.ids[self.select_category_caller_id]
         self.menu_select_category.items = items
 
+        # select default category if the selected one doesn't exist (anymore)
+        if self.ids[self.select_category_caller_id].text not in categories:
+            self.ids[self.select_category_caller_id].text = self.get_default_category(categories)
+
         # logging
-        loghandler.write_log(
-            LOG_FILE_ENTRY_VIEW, f"Created dropdown menu to select category; items: {items};"
-        )
+        loghandler.debug(LOG_FILE_ENTRY_VIEW, "Created dropdown menu to select category; categories: %s;", categories)
 
     def on_menu_select_category(self, category: str):
         """
@@ -121,15 +132,16 @@ class EntryAddView(MDScreen):
         self.ids[self.select_category_caller_id].text = category  # assign value of item to button text
 
     @staticmethod
-    def get_default_category() -> str:
+    def get_default_category(categories: list) -> str:
         """
         Call this function to get the default category.
         (This will be the first one in the list of the saved categories.)
 
-        :return: string of default category name
+        :param categories: list of category names, as returned by DataManagement.get_categories
+        :return: string of default category name, '' if there are no categories
         """
 
-        return str(data_management.DataManagement().get_categories()[0])
+        return str(categories[0]) if categories else ''
 
     def update_date_picker(self):
         """ called in the kivy file in on_pre_entry """
@@ -210,30 +222,45 @@ class EntryAddView(MDScreen):
         :return:
         """
 
-        try:
-            data_management.DataManagement().add_element(
-                self.ids[self.select_category_caller_id].text,
-                self.ids[self.item_input_id].text,
-                self.ids[self.earning_or_cost_field_id[1]].text,
-                self.ids[self.date_picker_id].text
-            )
-        except Exception as add_err:
+        def on_added(added):
+            # add_element logs its errors and returns False, e.g. on an unknown category or date
+            if not added:
+                on_add_error("see database log")
+                return
+
+            loghandler.write_log(LOG_FILE_ENTRY_VIEW, f"Added entry to database. ")
+
+            # Snackbar feedback that entry was added
+            # create a quick snackbar as feedback that category was created
+            Snackbar(text=f'Added new entry.',
+                     snackbar_x='20dp',
+                     snackbar_y='20dp',
+                     size_hint_x=(Window.width - (dp(20) * 2)) / Window.width,
+                     duration=1.5,
+                     ).open()
+
+        def on_add_error(add_err):
             errmsg = f"ADD ENTRY ERROR: {str(add_err)}"
             loghandler.write_log(LOG_FILE_ENTRY_VIEW,
-                                 f"Could not add entry to database. Check database log. Error message: {str(errmsg)}")
+                                 f"Could not add entry to database. Check database log. Error message: {str(errmsg)}", level=loghandler.ERROR)
             print(errmsg)
-            return
-
-        loghandler.write_log(LOG_FILE_ENTRY_VIEW, f"Added entry to database. ")
 
-        # Snackbar feedback that entry was added
-        # create a quick snackbar as feedback that category was created
-        Snackbar(text=f'Added new entry.',
-                 snackbar_x='20dp',
-                 snackbar_y='20dp',
-                 size_hint_x=(Window.width - (dp(20) * 2)) / Window.width,
-                 duration=1.5,
-                 ).open()
+            Snackbar(text=f'Could not add entry.',
+                     snackbar_x='20dp',
+                     snackbar_y='20dp',
+                     size_hint_x=(Window.width - (dp(20) * 2)) / Window.width,
+                     duration=1.5,
+                     ).open()
+
+        DatabaseWorker.instance().call(
+            "add_element",
+            self.ids[self.select_category_caller_id].text,
+            self.ids[self.item_input_id].text,
+            self.ids[self.earning_or_cost_field_id[1]].text,
+            self.ids[self.date_picker_id].text,
+            callback=on_added,
+            error_callback=on_add_error,
+        )
 
     def reset_entry_fields(self):
         """
@@ -245,7 +272,7 @@ class EntryAddView(MDScreen):
         self.add_entry_type = self.default_entry_type
         self.ids[self.default_entry_type_button_id].state = 'down'
         self.ids[self.item_input_id].text = ''
-        self.ids[self.select_category_caller_id].text = self.get_default_category()
+        self.ids[self.select_category_caller_id].text = ''  # default category is set on the next create_menu_select_category
         self.ids[self.date_picker_id].text = self.get_default_date()
         # self.date_dialog = None
         self.ids[self.earning_or_cost_field_id[1]].text = ''  # money value
@@ -30,6 +30,7 @@ from kivymd.uix.menu import MDDropdownMenu
 import data_management
 import loghandler
 import re
+from db_worker import DatabaseWorker
 
 
 # path to log file from main.pys view
@@ -55,41 +56,50 @@ class EntryView(MDScreen):
     _selected_display_month = None
 
     @staticmethod
-    def get_default_display_month() -> str:
+    def get_default_display_month(available_dates: list) -> str:
         """
         Call this function to get the default display month.
 
-        This will get a list of available dates from the database, which are sorted ascending.
+        The available dates from the database are sorted ascending.
         So this function will return the last (newest) date in that list.
 
+        :param available_dates: list of months, as returned by DataManagement.get_available_dates
         :return:
         """
 
         try:
-            return data_management.DataManagement().get_available_dates()[-1]
+            return available_dates[-1]
         except Exception as get_default_month_err:
             err_msg = (
                 f"ERROR GET DEFAULT MONTH TO DISPLAY: {str(get_default_month_err)}"
             )
-            loghandler.write_log(LOG_FILE_ENTRY_VIEW, err_msg)
+            loghandler.write_log(LOG_FILE_ENTRY_VIEW, err_msg, level=loghandler.ERROR)
             print(err_msg)
             return "Select Month"
 
+    def show_selected_month(self):
+        """
+        Show the selected month, or the newest month if none is selected or the selected one has no entries anymore.
+        Called in the kv file on_enter.
+        """
+
+        def on_available_dates(available_dates: list):
+            if self._selected_display_month in available_dates:
+                self.show_data_table(self._selected_display_month)
+            else:
+                self.show_data_table(self.get_default_display_month(available_dates))
+
+        DatabaseWorker.instance().call("get_available_dates", callback=on_available_dates)
+
     @staticmethod
     def clear_parent_children(parent_widget):
         """Delete children of widget."""
         if parent_widget.children:
             for child in parent_widget.children:
-                print("debug: remove child: %s" % child)
+                loghandler.debug(LOG_FILE_ENTRY_VIEW, "remove child: %s", child)
                 parent_widget.remove_widget(child)
 
     def show_data_table(self, display_month=""):
-        def get_float(string):
-            try:
-                return float(string)
-            except:
-                return 0.0
-
         if not display_month:
             display_month = self.default_display_month
 
@@ -110,7 +120,7 @@ class EntryView(MDScreen):
 
         except Exception as format_err:
             err_msg = f"ERROR SHOW DATA TABLE FORMAT ERROR: {str(format_err)}"
-            loghandler.write_log(LOG_FILE_ENTRY_VIEW, err_msg)
+            loghandler.write_log(LOG_FILE_ENTRY_VIEW, err_msg, level=loghandler.ERROR)
             print(err_msg)
 
             # add error widget
@@ -122,21 +132,21 @@ class EntryView(MDScreen):
             )
             return None
 
-        # get row data: [['<date>', '<item>', '<category>', '<cost>', '<rowid for button>'],...]
-        row_data = data_management.DataManagement().get_entries_by_date(display_month)
-
-        # add total costs
-        row_data = row_data + [
-            [
+        def on_month_total(total: int):
+            # total costs, shown after the last entry
+            total_row = [
                 "",
                 "",
                 "[b]Total:[/b]",
-                f"{(sum([get_float(d[3]) for d in row_data])):.2f}",
+                data_management.format_cents(total),
                 "",
             ]
-        ]
 
-        parent.show_entries(row_data, self)
+            # rows are loaded page by page while scrolling:
+            # [['<date>', '<item>', '<category>', '<cost>', '<rowid for button>'],...]
+            parent.show_month_entries(display_month, total_row, self)
+
+        DatabaseWorker.instance().call("get_month_total", display_month, callback=on_month_total)
 
     def delete_row(self, index: int):
         """
@@ -149,12 +159,13 @@ class EntryView(MDScreen):
         if index < 0:
             return
 
-        print(f"{index} deleted")
-        # delete entry
-        data_management.DataManagement().delete_entry(index)
-
-        # refresh data table
-        self.show_data_table(self.ids[self.select_display_month_caller_id].text)
+        loghandler.debug(LOG_FILE_ENTRY_VIEW, "Delete entry %s", index)
+        # delete entry, then refresh data table
+        DatabaseWorker.instance().call(
+            "delete_entry",
+            index,
+            callback=lambda _: self.show_data_table(self.ids[self.select_display_month_caller_id].text),
+        )
 
     def create_menu_select_display_month(self):
         """
@@ -177,6 +188,16 @@ class EntryView(MDScreen):
             )
 
         # update items
+        DatabaseWorker.instance().call("get_available_dates", callback=self.update_menu_select_display_month)
+
+    def update_menu_select_display_month(self, available_dates: list):
+        """
+        Set the items of the month dropdown menu.
+
+        :param available_dates: list of months, as returned by DataManagement.get_available_dates
+        :return:
+        """
+
         # define dropdown menu items
         items = [
             {
@@ -185,21 +206,18 @@ class EntryView(MDScreen):
                 "height": dp(54),
                 "on_release": lambda x=month: self.on_menu_select_display_month(str(x)),
             }
-            for month in data_management.DataManagement().get_available_dates()
+            for month in available_dates
         ]
         items.reverse()  # reverse, so the newest item is on top
         self.menu_select_display_month.items = items
 
         # if _selected_display_month is not in items anymore, get default one
         if self._selected_display_month:
-            if self._selected_display_month not in items:
-                self._selected_display_month = self.get_default_display_month()
+            if self._selected_display_month not in available_dates:
+                self._selected_display_month = self.get_default_display_month(available_dates)
 
         # logging
-        loghandler.write_log(
-            LOG_FILE_ENTRY_VIEW,
-            f"Created dropdown menu; items: {self.menu_select_display_month.items};",
-        )
+        loghandler.debug(LOG_FILE_ENTRY_VIEW, "Created dropdown menu; months: %s;", available_dates)
 
     def on_menu_select_display_month(self, month: str):
         """
@@ -300,10 +318,10 @@ class RecycleDataRow(RecycleDataViewBehavior, GridLayout):
         if rowid < 0:
             return
 
-        print(f"{rowid} deleted")
+        loghandler.debug(LOG_FILE_ENTRY_VIEW, "Delete entry %s", rowid)
 
-        # delete entry
-        data_management.DataManagement().delete_entry(rowid)
+        # delete entry; the data table refresh is queued after the deletion
+        DatabaseWorker.instance().call("delete_entry", rowid)
 
     # def open_entry_edit_dialog(self, root, rowid):
     #     print(f'Opening entry edit dialog for id {rowid}')
@@ -321,50 +339,143 @@ class RVDataTable(RecycleView):
 
     root_obj = ObjectProperty()
 
+    labels = [
+        "label_date",
+        "label_item",
+        "label_category",
+        "label_cost",
+        "label_delete",
+    ]
+
+    # entries loaded per page
+    page_size = 100
+    # load the next page when scrolled below this scroll_y (1: top, 0: bottom)
+    load_more_scroll_y = 0.2
+
+    # month which is loaded page by page
+    _month = None
+    _next_page = None  # keyset of the next page, None if all entries are loaded
+    _total_row = None  # row appended after the last page
+    _loading_page = False
+    _page_request = 0  # incremented for every shown month, to drop pages of a previous month
+
     def __init__(self, **kwargs):
         super(RVDataTable, self).__init__(**kwargs)
 
+        # load more entries while scrolling
+        self.fbind("scroll_y", self.on_scroll_y_load_more)
+
+    def get_header_data(self) -> dict:
+        return {
+            self.labels[0]: {"text": "[b]Date[/b]"},
+            self.labels[1]: {"text": "[b]Item[/b]"},
+            self.labels[2]: {"text": "[b]Category[/b]"},
+            self.labels[3]: {"text": "[b]Cost[/b]"},
+            self.labels[4]: {"text": "[b]Delete[/b]"},
+        }
+
+    def get_row_data(self, row) -> dict:
+        """Convert a row ['<date>', '<item>', '<category>', '<cost>', '<rowid>'] to view data."""
+
+        d = {}
+        for label_i, row_i in zip(self.labels, enumerate(row)):
+
+            d[label_i] = {"text": str(row_i[1])}
+
+            if row_i[0] == 4:
+                try:
+                    d[label_i] = {
+                        "text": "edit",
+                        "rowid": int(row_i[1]),
+                        "root_obj": self.root_obj,
+                    }
+                except:
+                    d[label_i] = {"text": str(row_i[1])}
+
+        # print('d: ', d)
+        return d
+
     def show_entries(self, row_data: list, root_obj):
         self.root_obj = root_obj
-
-        labels = [
-            "label_date",
-            "label_item",
-            "label_category",
-            "label_cost",
-            "label_delete",
-        ]
+        self._month = None
+        self._next_page = None
 
         # add header to data
-        self.data = [
-            {
-                labels[0]: {"text": "[b]Date[/b]"},
-                labels[1]: {"text": "[b]Item[/b]"},
-                labels[2]: {"text": "[b]Category[/b]"},
-                labels[3]: {"text": "[b]Cost[/b]"},
-                labels[4]: {"text": "[b]Delete[/b]"},
-            }
-        ]
+        self.data = [self.get_header_data()]
 
         # add row data to table
-        for row in row_data:
-            d = {}
-            for label_i, row_i in zip(labels, enumerate(row)):
-
-                d[label_i] = {"text": str(row_i[1])}
-
-                if row_i[0] == 4:
-                    try:
-                        d[label_i] = {
-                            "text": "edit",
-                            "rowid": int(row_i[1]),
-                            "root_obj": self.root_obj,
-                        }
-                    except:
-                        d[label_i] = {"text": str(row_i[1])}
-
-            # print('d: ', d)
-            self.data.append(d)
+        self.data.extend([self.get_row_data(row) for row in row_data])
+
+    def show_month_entries(self, month: str, total_row: list, root_obj):
+        """
+        Show the entries of a month. Only the first page is loaded,
+        the next pages are loaded while scrolling down.
+
+        :param month: string of month of format 'yyyy-mm'
+        :param total_row: row to show after the last entry
+        :param root_obj: EntryView
+        """
+
+        self.root_obj = root_obj
+        self._month = month
+        self._next_page = None
+        self._total_row = total_row
+        self._page_request += 1
+
+        # add header to data
+        self.data = [self.get_header_data()]
+        self.scroll_y = 1
+
+        self.load_next_page(first_page=True)
+
+    def load_next_page(self, first_page=False):
+        """Append the next page of entries of the current month; append the total row after the last page."""
+
+        if self._month is None or (self._next_page is None and not first_page):
+            return
+
+        self._loading_page = True
+        page_request = self._page_request
+
+        def on_page(page: tuple):
+            # drop the page if another month was shown in the meantime
+            if page_request != self._page_request:
+                return
+
+            entries, self._next_page = page
+            rows = entries + ([self._total_row] if self._next_page is None else [])
+
+            if not first_page:
+                self._keep_scroll_position(len(rows))
+            self.data.extend([self.get_row_data(row) for row in rows])
+
+            self._loading_page = False
+
+        DatabaseWorker.instance().call(
+            "get_entries_page",
+            self._month,
+            after=None if first_page else self._next_page,
+            limit=self.page_size,
+            callback=on_page,
+        )
+
+    def _keep_scroll_position(self, nr_new_rows: int):
+        """Keep the visible rows in place while the content grows by nr_new_rows."""
+
+        layout = self.layout_manager
+        if not layout:
+            return
+
+        old_height = layout.height
+        new_height = old_height + nr_new_rows * layout.default_size[1]
+        if old_height > self.height:
+            distance_from_top = (1 - self.scroll_y) * (old_height - self.height)
+            self.scroll_y = 1 - distance_from_top / (new_height - self.height)
+
+    def on_scroll_y_load_more(self, instance, value):
+        # load more entries when scrolled close to the bottom
+        if not self._loading_page and self._next_page is not None and value <= self.load_more_scroll_y:
+            self.load_next_page()
 
 
 class RVEntryEditButton(MDIconButton):
@@ -0,0 +1,92 @@
+"""
+This script handles the search view where entries are searched by name and category.
+"""
+
+from kivy.clock import Clock
+from kivy.properties import StringProperty
+from kivy.uix.screenmanager import SlideTransition
+from kivymd.uix.screen import MDScreen
+
+import loghandler
+from db_worker import DatabaseWorker
+
+
+class SearchView(MDScreen):
+
+    LOG_FILE = './logs/search_view.log'
+
+    # ids of the widgets, assigned in the kv file
+    search_input_id = StringProperty()
+    results_table_id = StringProperty()
+    results_label_id = StringProperty()
+
+    # max number of results shown
+    search_limit = 100
+
+    # wait for a typing pause before searching
+    search_delay = 0.3
+    _search_trigger = None
+    _search_request = 0  # incremented for every search, to drop results of a previous query
+
+    def on_search_text(self, text: str):
+        """ search after a short typing pause """
+
+        if self._search_trigger is None:
+            self._search_trigger = Clock.create_trigger(lambda dt: self.search(), self.search_delay)
+        self._search_trigger()
+
+    def search(self):
+        """ search the entries with the text of the search input and show the results """
+
+        query = self.ids[self.search_input_id].text.strip()
+        self._search_request += 1
+        search_request = self._search_request
+
+        if not query:
+            self.show_results(query, [])
+            return
+
+        def on_results(results: list):
+            # drop the results if another query was searched in the meantime
+            if search_request != self._search_request:
+                return
+            self.show_results(query, results)
+
+        DatabaseWorker.instance().call("search_entries", query, limit=self.search_limit, callback=on_results)
+
+    def show_results(self, query: str, results: list):
+        """
+        Show the search results in the data table.
+
+        :param query: searched text
+        :param results: list of entries as returned by DataManagement.search_entries
+        """
+
+        if not query:
+            self.ids[self.results_label_id].text = ''
+        elif len(results) >= self.search_limit:
+            self.ids[self.results_label_id].text = f"Showing the newest {len(results)} results"
+        else:
+            self.ids[self.results_label_id].text = f"{len(results)} results"
+
+        loghandler.write_log(self.LOG_FILE, f"Searched '{query}': {len(results)} results;")
+
+        # the search results are read only, an empty last column disables the edit button
+        rows = [(date, name, category, value, '') for date, name, category, value, _ in results]
+        self.ids[self.results_table_id].show_entries(rows, self)
+
+    def clear_search(self):
+        self.ids[self.search_input_id].text = ''
+        self.show_results('', [])
+
+    def on_back_button(self):
+        """
+        Go back to the default screen
+
+        :return:
+        """
+
+        # transition options
+        self.manager.transition = SlideTransition()
+        self.manager.transition.direction = 'right'
+        self.manager.current = 'entry_view'
@@ -2,9 +2,11 @@
 This script handles the general settings of the application
 """
 
+from kivy.properties import BooleanProperty
 from kivy.uix.screenmanager import SlideTransition
 from kivymd.uix.screen import MDScreen
 from save_system import SaveSystem
+from query_stats import QueryStats
 import loghandler
 
 
@@ -12,12 +14,19 @@ class SettingsView(MDScreen):
 
     LOG_FILE = './logs/settings_view.log'
 
+    # hidden debug panel, shown after tapping the title debug_panel_taps times
+    debug_panel_taps = 5
+    debug_panel_visible = BooleanProperty(False)
+    _title_taps = 0
+
+    # seconds between the dumps of the query stats to the log
+    QUERY_STATS_LOG_INTERVAL = 60
 
     def get_dark_theme_value(self):
         # apply dark theme settings
 
         try:
-            dark = SaveSystem.load_variable(SaveSystem().SAVE_FILE_SETTINGS, 'dark_mode')
+            dark = SaveSystem.load_variable(SaveSystem.SAVE_FILE_SETTINGS, 'dark_mode')
 
             if dark and dark is not None:
                 return dark
@@ -26,7 +35,7 @@ class SettingsView(MDScreen):
 
         except Exception as dark_mode_err:
             errmsg = f"GET DARK MODE VALUE ERROR: {str(dark_mode_err)}"
-            loghandler.write_log(self.LOG_FILE, errmsg)
+            loghandler.write_log(self.LOG_FILE, errmsg, level=loghandler.ERROR)
             print(errmsg)
             return False
 
@@ -66,4 +75,45 @@ class SettingsView(MDScreen):
             theme_cls.accent_palette = "Gray"
 
         # save new value
-        SaveSystem().save_variable(SaveSystem().SAVE_FILE_SETTINGS, 'dark_mode', active_value)
+        SaveSystem.save_variable(SaveSystem.SAVE_FILE_SETTINGS, 'dark_mode', active_value)
+
+    # region debug_panel
+    def on_title_tap(self):
+        """ count the taps on the title, show the debug panel after debug_panel_taps taps """
+
+        self._title_taps += 1
+        if self._title_taps >= self.debug_panel_taps:
+            self.debug_panel_visible = True
+            self.refresh_query_stats()
+
+    @staticmethod
+    def get_query_stats_value() -> bool:
+        return bool(SaveSystem.load_variable(SaveSystem.SAVE_FILE_SETTINGS, 'query_stats'))
+
+    @classmethod
+    def apply_query_stats_setting(cls, active_value: bool):
+        """
+        Start or stop recording the timing stats of the database calls
+
+        :param active_value: True to record and dump them to the log periodically
+        """
+
+        if active_value:
+            QueryStats.enable(log_interval=cls.QUERY_STATS_LOG_INTERVAL)
+        else:
+            QueryStats.disable()
+
+    def on_query_stats_switch(self, active_value: bool):
+        self.apply_query_stats_setting(active_value)
+
+        # save new value
+        SaveSystem.save_variable(SaveSystem.SAVE_FILE_SETTINGS, 'query_stats', active_value)
+        loghandler.write_log(self.LOG_FILE, f"Query stats {'enabled' if active_value else 'disabled'};")
+
+    def refresh_query_stats(self):
+        self.ids.query_stats_label.text = QueryStats.format_stats()
+
+    def reset_query_stats(self):
+        QueryStats.reset()
+        self.refresh_query_stats()
+    # endregion